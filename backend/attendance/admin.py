@@ -1,9 +1,9 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import path
-from django.http import HttpResponse
 from import_export import resources, fields
 from import_export.admin import ExportMixin
+from mac_attendance.exports import StreamingExportMixin
 from .models import Attendance, AttendanceStats
 
 
@@ -19,6 +19,9 @@ class AttendanceStatsResource(resources.ModelResource):
                   'attendance_percentage', 'cumple_requisito')
         export_order = fields
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('student').with_eligibility()
+
     def dehydrate_account_number(self, stats):
         """Obtener número de cuenta del estudiante"""
         return stats.student.account_number
@@ -78,13 +81,18 @@ class AttendanceAdmin(admin.ModelAdmin):
         return request.user.is_superuser
 
 @admin.register(AttendanceStats)
-class AttendanceStatsAdmin(ExportMixin, admin.ModelAdmin):
+class AttendanceStatsAdmin(StreamingExportMixin, ExportMixin, admin.ModelAdmin):
     resource_class = AttendanceStatsResource
     list_display = ['student', 'attended_events', 'total_events', 'attendance_percentage', 'get_cumple_requisito']
     ordering = ['-attendance_percentage']
     list_filter = ['attendance_percentage']
     search_fields = ['student__account_number', 'student__full_name']
-    actions = ['export_selected_stats', 'export_students_with_certificate']
+    actions = ['export_selected_stats', 'export_students_with_certificate', 'export_selected_csv', 'export_selected_jsonl']
+    streaming_export_filename = 'estadisticas_asistencia'
+
+    def get_queryset(self, request):
+        # Estudiante y elegibilidad en la misma consulta (sin una consulta por fila)
+        return super().get_queryset(request).select_related('student').with_eligibility()
 
     def get_cumple_requisito(self, obj):
         """Mostrar si cumple el requisito mínimo"""
@@ -96,58 +104,19 @@ class AttendanceStatsAdmin(ExportMixin, admin.ModelAdmin):
             color, text
         )
     get_cumple_requisito.short_description = 'Cumple requisito'
+    get_cumple_requisito.admin_order_field = 'meets_minimum'
 
     def export_selected_stats(self, request, queryset):
         """Acción para exportar estadísticas seleccionadas"""
-        resource = AttendanceStatsResource()
-        dataset = resource.export(queryset)
-
-        from import_export.formats.base_formats import XLSX
-        xlsx_format = XLSX()
-        export_data = xlsx_format.export_data(dataset)
-
-        response = HttpResponse(
-            export_data,
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename="estadisticas_asistencia.xlsx"'
-
-        self.message_user(request, f'Se exportaron {queryset.count()} estadísticas.')
-        return response
+        return self.stream_export(request, queryset, 'xlsx', 'estadisticas_asistencia')
 
     export_selected_stats.short_description = "📊 Exportar estadísticas seleccionadas"
 
     def export_students_with_certificate(self, request, queryset):
         """Acción para exportar solo estudiantes que cumplen el requisito mínimo"""
-        from authentication.models import SystemConfiguration
-        config = SystemConfiguration.get_config()
-
-        # Filtrar solo los que cumplen el requisito
-        qualified_students = queryset.filter(
-            attendance_percentage__gte=config.minimum_attendance_percentage
-        )
-
-        # Crear el recurso y exportar
-        resource = AttendanceStatsResource()
-        dataset = resource.export(qualified_students)
-
-        # Generar archivo Excel
-        from import_export.formats.base_formats import XLSX
-        xlsx_format = XLSX()
-        export_data = xlsx_format.export_data(dataset)
-
-        response = HttpResponse(
-            export_data,
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename="estudiantes_con_constancia.xlsx"'
-
-        self.message_user(
-            request,
-            f'Se exportaron {qualified_students.count()} estudiantes que cumplen con el {config.minimum_attendance_percentage}% de asistencia mínima.'
-        )
-
-        return response
+        # Filtrar solo los que cumplen el requisito (comparación anotada en SQL)
+        qualified_students = queryset.with_eligibility().filter(meets_minimum=True)
+        return self.stream_export(request, qualified_students, 'xlsx', 'estudiantes_con_constancia')
 
     export_students_with_certificate.short_description = "📊 Exportar estudiantes que cumplen requisito para constancia"
 
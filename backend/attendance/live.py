@@ -0,0 +1,329 @@
+"""
+Transmisión en vivo (Server-Sent Events) de las asistencias registradas.
+
+Las asistencias se publican en el difusor al confirmarse la
+transacción que las crea (señal post_save para altas individuales y
+publicación explícita en el registro por lotes, que usa bulk_create). Cada
+conexión abierta en /api/attendance/stream/ tiene su propia cola acotada: si un
+cliente lento la llena se descartan sus mensajes más antiguos, sin frenar a
+quien registra ni a las demás conexiones. Cada conexión ocupa un hilo del
+servidor, por eso hay un máximo de conexiones por proceso y cada una se cierra
+a los ATTENDANCE_STREAM_MAX_DURATION segundos.
+
+Con un backend de caché compartido (Redis/Memcached) las publicaciones pasan
+por la caché y llegan a los tableros conectados a cualquier worker, con hasta
+RELAY_POLL_INTERVAL segundos de retraso. Con un backend local (LocMemCache) el
+difusor vive en la memoria de cada proceso y los tableros solo reciben lo
+registrado en su mismo proceso.
+"""
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import BaseRenderer
+from mac_attendance.caching import is_shared_cache
+
+logger = logging.getLogger(__name__)
+
+STREAM_TOKEN_SALT = 'attendance.live.stream'
+STREAM_SEQUENCE_KEY = 'attendance:stream:sequence'
+STREAM_MESSAGE_KEY = 'attendance:stream:{id}'
+STREAM_MESSAGE_TIMEOUT = 10 * 60  # segundos que un mensaje queda disponible para reenvío
+RELAY_POLL_INTERVAL = 0.5  # segundos entre lecturas de la caché compartida
+RELAY_GAP_TIMEOUT = 5  # segundos de espera por un id reservado antes de saltarlo
+
+
+class Subscription:
+    """Conexión suscrita al difusor, opcionalmente filtrada por evento"""
+
+    def __init__(self, event_id=None, maxsize=100):
+        self.event_id = event_id
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.last_id = 0
+
+    def wants(self, message):
+        return self.event_id is None or message['event_id'] == self.event_id
+
+    def put(self, message):
+        # El reenvío de Last-Event-ID y el relevo pueden traer el mismo mensaje
+        if message['id'] <= self.last_id:
+            return
+        self.last_id = message['id']
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # Cliente lento: descartar el mensaje más antiguo en lugar de bloquear
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(message)
+            except queue.Full:
+                self.dropped += 1
+
+
+class AttendanceBroadcaster:
+    """
+    Difusor de asistencias nuevas. Conserva las últimas publicaciones para
+    reenviarlas a un cliente que se reconecta con Last-Event-ID.
+
+    Con un backend de caché compartido, publish() guarda los mensajes en la caché
+    con ids de una secuencia común y un hilo de relevo por proceso los entrega a
+    sus conexiones, así que cada tablero recibe lo registrado en cualquier worker.
+    Con un backend local todo queda en el proceso.
+    """
+
+    def __init__(self, history_size=200):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._history = deque(maxlen=history_size)
+        self._ids = itertools.count(1)
+        self._relay_lock = threading.Lock()
+        self._relay_thread = None
+        self._relay_pid = None
+
+    def subscribe(self, event_id=None, last_event_id=None, limit=None):
+        """Nueva suscripción, o None si ya hay `limit` conexiones abiertas"""
+        subscription = Subscription(event_id, maxsize=settings.ATTENDANCE_STREAM_QUEUE_SIZE)
+        shared = is_shared_cache()
+        with self._lock:
+            if limit is not None and len(self._subscriptions) >= limit:
+                return None
+            if last_event_id is not None:
+                # Con el candado tomado el relevo no entrega nada entre el reenvío y el alta
+                history = self._shared_backlog(last_event_id) if shared else self._history
+                for message in history:
+                    if message['id'] > last_event_id and subscription.wants(message):
+                        subscription.put(message)
+            self._subscriptions.add(subscription)
+        if shared:
+            self._ensure_relay()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, payloads):
+        """Entregar las asistencias a todas las conexiones interesadas (de todos los procesos)"""
+        if is_shared_cache():
+            self._publish_shared(payloads)
+            return
+        self._deliver([{'id': next(self._ids), **payload} for payload in payloads])
+
+    def _deliver(self, messages):
+        with self._lock:
+            for message in messages:
+                self._history.append(message)
+                for subscription in self._subscriptions:
+                    if subscription.wants(message):
+                        subscription.put(message)
+
+    @staticmethod
+    def _publish_shared(payloads):
+        if not payloads:
+            return
+        cache.add(STREAM_SEQUENCE_KEY, 0, timeout=None)
+        try:
+            last_id = cache.incr(STREAM_SEQUENCE_KEY, len(payloads))
+        except ValueError:
+            # La secuencia fue expulsada entre add() e incr()
+            cache.add(STREAM_SEQUENCE_KEY, 0, timeout=None)
+            last_id = cache.incr(STREAM_SEQUENCE_KEY, len(payloads))
+        first_id = last_id - len(payloads) + 1
+        cache.set_many({
+            STREAM_MESSAGE_KEY.format(id=message_id): {'id': message_id, **payload}
+            for message_id, payload in enumerate(payloads, start=first_id)
+        }, STREAM_MESSAGE_TIMEOUT)
+
+    def _shared_messages(self, first_id, last_id):
+        """Mensajes guardados en la caché con id en [first_id, last_id]; None donde falta uno"""
+        first_id = max(first_id, last_id - self._history.maxlen + 1)
+        found = cache.get_many([STREAM_MESSAGE_KEY.format(id=i) for i in range(first_id, last_id + 1)])
+        return [(i, found.get(STREAM_MESSAGE_KEY.format(id=i))) for i in range(first_id, last_id + 1)]
+
+    def _shared_backlog(self, last_event_id):
+        last_id = cache.get(STREAM_SEQUENCE_KEY) or 0
+        return [message for _, message in self._shared_messages(last_event_id + 1, last_id) if message]
+
+    def _ensure_relay(self):
+        # Con workers creados por fork el hilo del proceso padre no existe en el hijo
+        if self._relay_thread is not None and self._relay_pid == os.getpid():
+            return
+        with self._relay_lock:
+            if self._relay_thread is not None and self._relay_pid == os.getpid():
+                return
+            self._relay_pid = os.getpid()
+            # La secuencia se lee antes de volver de subscribe para no perder lo publicado mientras arranca
+            next_id = (cache.get(STREAM_SEQUENCE_KEY) or 0) + 1
+            self._relay_thread = threading.Thread(
+                target=self._relay, args=(next_id,), name='attendance-stream-relay', daemon=True
+            )
+            self._relay_thread.start()
+
+    def _relay(self, next_id):
+        """
+        Entregar a las conexiones del proceso los mensajes nuevos de la caché compartida.
+        Termina cuando ya no quedan conexiones; la siguiente suscripción lo vuelve a iniciar.
+        """
+        gap_since = None
+        while True:
+            time.sleep(RELAY_POLL_INTERVAL)
+            # Con ambos candados: una suscripción nueva o ve el hilo vivo o lo inicia
+            with self._relay_lock, self._lock:
+                if not self._subscriptions:
+                    self._relay_thread = None
+                    return
+            try:
+                last_id = cache.get(STREAM_SEQUENCE_KEY) or 0
+                messages = []
+                for message_id, message in self._shared_messages(next_id, last_id):
+                    if message is None:
+                        # Id reservado por otro proceso que aún no guarda el mensaje
+                        gap_since = gap_since or time.monotonic()
+                        if time.monotonic() - gap_since < RELAY_GAP_TIMEOUT:
+                            break
+                    else:
+                        messages.append(message)
+                    gap_since = None
+                    next_id = message_id + 1
+                if messages:
+                    self._deliver(messages)
+            except Exception:
+                logger.exception('Error al leer el flujo de asistencias compartido')
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscriptions)
+
+
+broadcaster = AttendanceBroadcaster()
+
+
+def attendance_payload(attendance, attendee_name=None, event_title=None, registered_by=None):
+    """Datos públicos de una asistencia; los nombres conocidos evitan consultas adicionales"""
+    return {
+        'attendance_id': attendance.pk,
+        'event_id': attendance.event_id,
+        'event_title': event_title or attendance.event.title,
+        'attendee_name': attendee_name or attendance.attendee_name,
+        'attendee_type': 'student' if attendance.student_id else 'external',
+        'registered_by': registered_by or attendance.registered_by.full_name,
+        'timestamp': attendance.timestamp.isoformat(),
+    }
+
+
+def publish_on_commit(payloads):
+    """Publicar cuando se confirme la transacción actual (de inmediato fuera de una)"""
+    payloads = list(payloads)
+    if payloads:
+        transaction.on_commit(lambda: broadcaster.publish(payloads))
+
+
+def issue_stream_token(user):
+    """Token firmado que solo abre el flujo en vivo y vence en ATTENDANCE_STREAM_TOKEN_TTL segundos"""
+    return signing.dumps({'user_id': user.pk}, salt=STREAM_TOKEN_SALT)
+
+
+class StreamTokenAuthentication(BaseAuthentication):
+    """
+    Token del flujo en el parámetro ?token=, para EventSource del navegador, que no
+    permite enviar el encabezado Authorization. Las URL quedan en los logs de los
+    proxies, así que no se usa el JWT de acceso: este token solo sirve para abrir
+    el flujo y vence en segundos.
+    """
+
+    def authenticate(self, request):
+        token = request.query_params.get('token')
+        if not token:
+            return None
+        try:
+            data = signing.loads(token, salt=STREAM_TOKEN_SALT, max_age=settings.ATTENDANCE_STREAM_TOKEN_TTL)
+        except signing.BadSignature:
+            raise AuthenticationFailed('Token del flujo inválido o vencido')
+        user = User.objects.filter(pk=data.get('user_id'), is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed('Token del flujo inválido o vencido')
+        return user, None
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="stream"'
+
+
+def format_message(message):
+    data = json.dumps(message, ensure_ascii=False)
+    return f'id: {message["id"]}\nevent: attendance\ndata: {data}\n\n'
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Acepta el encabezado Accept: text/event-stream de EventSource. El flujo se
+    envía con StreamingHttpResponse; este renderer solo serializa los errores.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class EventStream:
+    """
+    Cuerpo de la respuesta SSE de una suscripción. Envía un comentario de latido
+    cuando no hay mensajes y termina después de max_duration segundos (el cliente
+    se reconecta), para no retener indefinidamente el hilo del servidor. Django
+    llama a close() al cerrar la respuesta, aunque el cliente se haya ido antes
+    del primer byte, así que la suscripción nunca queda abierta.
+    """
+
+    def __init__(self, subscription, heartbeat=None, max_duration=None):
+        self.subscription = subscription
+        self.heartbeat = heartbeat or settings.ATTENDANCE_STREAM_HEARTBEAT
+        self.max_duration = max_duration or settings.ATTENDANCE_STREAM_MAX_DURATION
+
+    def __iter__(self):
+        deadline = time.monotonic() + self.max_duration
+        yield f'retry: {settings.ATTENDANCE_STREAM_RETRY_MS}\n\n'
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    message = self.subscription.queue.get(timeout=min(self.heartbeat, remaining))
+                except queue.Empty:
+                    yield ': heartbeat\n\n'
+                    continue
+                yield format_message(message)
+        finally:
+            self.close()
+
+    def close(self):
+        broadcaster.unsubscribe(self.subscription)
+
+
+def open_stream(event_id=None, last_event_id=None):
+    """
+    Suscribirse al difusor para una conexión nueva. Cada conexión ocupa un hilo del
+    servidor mientras dura, así que hay como máximo ATTENDANCE_STREAM_MAX_CONNECTIONS
+    por proceso (menos que sus hilos, para que siempre queden hilos para registrar);
+    devuelve None si ya no hay lugar.
+    """
+    subscription = broadcaster.subscribe(event_id, last_event_id, limit=settings.ATTENDANCE_STREAM_MAX_CONNECTIONS)
+    return EventStream(subscription) if subscription is not None else None
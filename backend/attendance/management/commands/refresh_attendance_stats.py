@@ -0,0 +1,40 @@
+"""
+Recalcular las estadísticas de asistencia de todos los estudiantes.
+
+Uso:
+    python manage.py refresh_attendance_stats            # Solo total y porcentaje
+    python manage.py refresh_attendance_stats --recount  # Recuento completo (reparación)
+"""
+import time
+from django.core.management.base import BaseCommand
+from attendance.models import AttendanceStats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula en bloque las estadísticas de asistencia de todos los estudiantes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Recontar también las asistencias y crear las filas faltantes'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tamaño de lote para crear filas faltantes (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        if options['recount']:
+            updated = AttendanceStats.rebuild_all(batch_size=options['batch_size'])
+        else:
+            updated = AttendanceStats.refresh_denominators()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Se actualizaron {updated} estadísticas en {elapsed:.2f}s'
+        ))
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.6 on 2026-10-17 10:08
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Round
+
+
+def recount_student_stats(AttendanceStats, Attendance, student_ids, batch_size=500):
+    """
+    Recontar las asistencias válidas de los estudiantes dados, como
+    AttendanceStats.rebuild_all(): .update() no envía señales, así que las
+    invalidaciones de esta migración no descuentan nada por sí solas.
+    """
+    attended = Subquery(
+        Attendance.objects.filter(student_id=OuterRef('student_id'), is_valid=True)
+        .order_by()
+        .values('student_id')
+        .annotate(attended=Count('id'))
+        .values('attended')
+    )
+    percentage = models.Case(
+        models.When(
+            total_events__gt=0,
+            then=Round(
+                models.ExpressionWrapper(
+                    F('attended_events') * 100.0 / F('total_events'), output_field=models.FloatField()
+                ),
+                2
+            )
+        ),
+        default=models.Value(0.0),
+        output_field=models.FloatField()
+    )
+    student_ids = sorted(student_ids)
+    for start in range(0, len(student_ids), batch_size):
+        stats = AttendanceStats.objects.filter(student_id__in=student_ids[start:start + batch_size])
+        stats.update(attended_events=Coalesce(attended, 0))
+        stats.update(attendance_percentage=percentage)
+
+
+def invalidate_duplicate_attendances(apps, schema_editor):
+    """Invalidar asistencias válidas duplicadas (se conserva la más antigua) antes de crear las restricciones"""
+    Attendance = apps.get_model('attendance', 'Attendance')
+    AttendanceStats = apps.get_model('attendance', 'AttendanceStats')
+
+    affected_students = set()
+    for field in ('student', 'external_user'):
+        duplicated = (
+            Attendance.objects.filter(is_valid=True, **{f'{field}__isnull': False})
+            .values(field, 'event')
+            .annotate(total=Count('id'))
+            .filter(total__gt=1)
+        )
+        for group in duplicated:
+            keep = Attendance.objects.filter(
+                is_valid=True, event=group['event'], **{field: group[field]}
+            ).order_by('timestamp', 'id').first()
+            if field == 'student':
+                affected_students.add(group['student'])
+            Attendance.objects.filter(
+                is_valid=True, event=group['event'], **{field: group[field]}
+            ).exclude(pk=keep.pk).update(
+                is_valid=False,
+                notes='Invalidada automáticamente: asistencia duplicada'
+            )
+
+    recount_student_stats(AttendanceStats, Attendance, affected_students)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_alter_attendance_external_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(invalidate_duplicate_attendances, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_valid', True)), fields=('student', 'event'), name='unique_valid_student_attendance'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_valid', True)), fields=('external_user', 'event'), name='unique_valid_external_attendance'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-17 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_valid_attendance_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['-timestamp', '-id'], name='attendance_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['event', '-timestamp', '-id'], name='attendance_event_recent_idx'),
+        ),
+    ]
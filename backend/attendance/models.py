@@ -1,9 +1,13 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Round
+from django.db.models.lookups import GreaterThan
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from datetime import datetime, time as dt_time, timedelta
+from datetime import timedelta
 from authentication.models import UserProfile, ExternalUser
 from events.models import Event
+from events.intervals import overlapping_event_ids
+from . import stats_cache
 
 class Attendance(models.Model):
     REGISTRATION_METHODS = (
@@ -64,13 +68,31 @@ class Attendance(models.Model):
         verbose_name = "Asistencia"
         verbose_name_plural = "Asistencias"
         ordering = ['-timestamp']
+        constraints = [
+            # Solo una asistencia válida por asistente y evento (a prueba de concurrencia)
+            models.UniqueConstraint(
+                fields=['student', 'event'],
+                condition=models.Q(is_valid=True),
+                name='unique_valid_student_attendance'
+            ),
+            models.UniqueConstraint(
+                fields=['external_user', 'event'],
+                condition=models.Q(is_valid=True),
+                name='unique_valid_external_attendance'
+            ),
+        ]
+        indexes = [
+            # Paginación por cursor de asistencias recientes (global y por evento)
+            models.Index(fields=['-timestamp', '-id'], name='attendance_recent_idx'),
+            models.Index(fields=['event', '-timestamp', '-id'], name='attendance_event_recent_idx'),
+        ]
     
     def clean(self):
         # Debe tener estudiante O usuario externo, pero no ambos
-        if not self.student and not self.external_user:
+        if not self.student_id and not self.external_user_id:
             raise ValidationError("Debe especificar un estudiante o usuario externo.")
 
-        if self.student and self.external_user:
+        if self.student_id and self.external_user_id:
             raise ValidationError("No puede tener ambos: estudiante y usuario externo.")
 
         # Validar que el registrador sea un asistente
@@ -78,96 +100,124 @@ class Attendance(models.Model):
             raise ValidationError("Solo los asistentes pueden registrar asistencias.")
 
         # Validar que el evento esté en curso (entre start_time y end_time)
-        now = timezone.now()
-        event_date = self.event.date
-        event_start = datetime.combine(event_date, self.event.start_time)
-        event_end = datetime.combine(event_date, self.event.end_time)
+        self.check_registration_window(self.event)
 
-        # Hacer timezone-aware si es necesario
-        if timezone.is_naive(event_start):
-            event_start = timezone.make_aware(event_start)
-        if timezone.is_naive(event_end):
-            event_end = timezone.make_aware(event_end)
+        # Los duplicados los impide la base de datos (ver Meta.constraints y save())
+
+        # Validar eventos simultáneos (solo para estudiantes regulares)
+        if self.student_id:
+            overlapping_ids = overlapping_event_ids(self.event)
+
+            existing_attendance = bool(overlapping_ids) and Attendance.objects.filter(
+                student_id=self.student_id,
+                event_id__in=overlapping_ids,
+                is_valid=True
+            ).exists()
+
+            if existing_attendance:
+                raise ValidationError(
+                    "El estudiante ya tiene asistencia registrada en un evento simultáneo."
+                )
+
+    @staticmethod
+    def check_registration_window(event, now=None):
+        """Validar que el evento acepte registros en este momento"""
+        now = now or timezone.now()
 
         # Permitir registro desde 10 minutos antes hasta el final del evento
-        registration_start = event_start - timedelta(minutes=10)
+        registration_start, event_end = event.get_registration_window()
 
         if now < registration_start:
             raise ValidationError(
                 f"No se puede registrar asistencia antes del evento. "
-                f"El evento inicia el {event_date.strftime('%d/%m/%Y')} a las {self.event.start_time.strftime('%H:%M')}. "
+                f"El evento inicia el {event.date.strftime('%d/%m/%Y')} a las {event.start_time.strftime('%H:%M')}. "
                 f"Puedes registrar desde 10 minutos antes."
             )
 
         if now > event_end:
             raise ValidationError(
                 f"No se puede registrar asistencia después del evento. "
-                f"El evento terminó el {event_date.strftime('%d/%m/%Y')} a las {self.event.end_time.strftime('%H:%M')}."
+                f"El evento terminó el {event.date.strftime('%d/%m/%Y')} a las {event.end_time.strftime('%H:%M')}."
             )
 
-        # Validar que no haya duplicados
-        if self.student:
-            existing = Attendance.objects.filter(
-                student=self.student,
-                event=self.event,
-                is_valid=True
-            )
-            if self.pk:
-                existing = existing.exclude(pk=self.pk)
-            if existing.exists():
-                raise ValidationError("Este estudiante ya tiene asistencia registrada para este evento.")
-        
-        if self.external_user:
-            existing = Attendance.objects.filter(
-                external_user=self.external_user,
-                event=self.event,
-                is_valid=True
-            )
-            if self.pk:
-                existing = existing.exclude(pk=self.pk)
-            if existing.exists():
-                raise ValidationError("Este usuario externo ya tiene asistencia registrada para este evento.")
-        
-        # Validar eventos simultáneos (solo para estudiantes regulares)
-        if self.student:
-            overlapping_events = Event.objects.filter(
-                date=self.event.date,
-                start_time__lt=self.event.end_time,
-                end_time__gt=self.event.start_time,
-                is_active=True
-            ).exclude(id=self.event.id)
-            
-            existing_attendance = Attendance.objects.filter(
-                student=self.student,
-                event__in=overlapping_events,
-                is_valid=True
-            ).exists()
-            
-            if existing_attendance:
-                raise ValidationError(
-                    "El estudiante ya tiene asistencia registrada en un evento simultáneo."
-                )
-    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Recordar el estado cargado para aplicar deltas a las estadísticas y al padrón
+        loaded = dict(zip(field_names, values))
+        instance._loaded_state = {
+            key: loaded.get(key) for key in ('student_id', 'external_user_id', 'event_id', 'is_valid')
+        }
+        return instance
+
+    def _current_state(self):
+        return {
+            'student_id': self.student_id,
+            'external_user_id': self.external_user_id,
+            'event_id': self.event_id,
+            'is_valid': self.is_valid,
+        }
+
     def save(self, *args, **kwargs):
         self.clean()
-        super().save(*args, **kwargs)
-        
-        # Actualizar estadísticas si es estudiante regular
-        if self.student:
-            self.update_student_stats()
-    
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+
+                # Actualizar estadísticas si es (o era) estudiante regular
+                self.update_student_stats()
+        except IntegrityError:
+            # Conflicto con las restricciones únicas: ya existe una asistencia válida
+            if self.is_valid and self._valid_duplicates().exists():
+                if self.student_id:
+                    raise ValidationError("Este estudiante ya tiene asistencia registrada para este evento.")
+                raise ValidationError("Este usuario externo ya tiene asistencia registrada para este evento.")
+            raise
+
+        self.update_roster()
+        self._loaded_state = self._current_state()
+
+    def update_roster(self):
+        """Reflejar el alta, la invalidación o la reasignación en el padrón en caché del evento"""
+        from . import roster
+
+        old = getattr(self, '_loaded_state', None)
+        new = self._current_state()
+        if old == new:
+            return
+
+        if old and old['is_valid']:
+            roster.forget(old['event_id'], old['student_id'], old['external_user_id'])
+        if self.is_valid:
+            event_id, attendee = self.event_id, (self.student_id, self.external_user_id)
+            transaction.on_commit(lambda: roster.record(event_id, [attendee]))
+
+    def _valid_duplicates(self):
+        """Otras asistencias válidas del mismo asistente para el mismo evento"""
+        duplicates = Attendance.objects.filter(event_id=self.event_id, is_valid=True)
+        if self.student_id:
+            duplicates = duplicates.filter(student_id=self.student_id)
+        else:
+            duplicates = duplicates.filter(external_user_id=self.external_user_id)
+        if self.pk:
+            duplicates = duplicates.exclude(pk=self.pk)
+        return duplicates
+
     def update_student_stats(self):
-        """Actualizar las estadísticas de asistencia del estudiante"""
-        stats, created = AttendanceStats.objects.get_or_create(
-            student=self.student,
-            defaults={
-                'total_events': 0,
-                'attended_events': 0,
-                'attendance_percentage': 0.0
-            }
-        )
-        stats.update_stats()
-    
+        """Aplicar a las estadísticas el cambio de esta asistencia (alta, invalidación o reasignación)"""
+        old = getattr(self, '_loaded_state', None) or {'student_id': None, 'is_valid': False}
+        old_student_id, old_is_valid = old['student_id'], old['is_valid']
+
+        deltas = {}
+        if old_student_id and old_is_valid:
+            deltas[old_student_id] = deltas.get(old_student_id, 0) - 1
+        if self.student_id and self.is_valid:
+            deltas[self.student_id] = deltas.get(self.student_id, 0) + 1
+
+        for student_id, delta in deltas.items():
+            if delta:
+                AttendanceStats.apply_attendance_delta([student_id], delta)
+
     @property
     def attendee_name(self):
         """Nombre del asistente (estudiante o externo)"""
@@ -189,6 +239,19 @@ class Attendance(models.Model):
     def __str__(self):
         return f"{self.attendee_name} - {self.event.title}"
 
+class AttendanceStatsQuerySet(models.QuerySet):
+    def with_eligibility(self):
+        """Anotar meets_minimum comparando el porcentaje con el umbral vigente en SQL"""
+        from authentication.models import SystemConfiguration
+        minimum = SystemConfiguration.get_config().minimum_attendance_percentage
+        return self.annotate(
+            meets_minimum=models.ExpressionWrapper(
+                models.Q(attendance_percentage__gte=minimum),
+                output_field=models.BooleanField()
+            )
+        )
+
+
 class AttendanceStats(models.Model):
     student = models.OneToOneField(
         UserProfile,
@@ -213,16 +276,105 @@ class AttendanceStats(models.Model):
         verbose_name="Última actualización"
     )
     
+    objects = AttendanceStatsQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Estadísticas de asistencia"
         verbose_name_plural = "Estadísticas de asistencia"
     
-    def update_stats(self):
-        """Actualizar las estadísticas de asistencia"""
-        from events.models import Event  # Importar aquí para evitar circular imports
-        
-        # Contar TODOS los eventos activos
+    @staticmethod
+    def percentage_expression(attended, total):
+        """Expresión SQL para el porcentaje de asistencia redondeado a 2 decimales"""
+        return models.Case(
+            models.When(
+                GreaterThan(total, 0),
+                then=Round(
+                    models.ExpressionWrapper(attended * 100.0 / total, output_field=models.FloatField()),
+                    2
+                )
+            ),
+            default=models.Value(0.0),
+            output_field=models.FloatField()
+        )
+
+    @classmethod
+    def apply_attendance_delta(cls, student_ids, delta):
+        """
+        Sumar (o restar) asistencias válidas con un UPDATE atómico basado en F(),
+        recalculando el porcentaje en la misma sentencia y sin recontar el historial
+        """
+        student_ids = set(student_ids)
+        if not student_ids or not delta:
+            return
+
+        attended = models.F('attended_events') + delta
+        updated = cls.objects.filter(student_id__in=student_ids).update(
+            attended_events=attended,
+            attendance_percentage=cls.percentage_expression(attended, models.F('total_events')),
+            last_updated=timezone.now()
+        )
+        stats_cache.invalidate_students(student_ids)
+
+        # Los estudiantes sin fila de estadísticas se crean con un recuento completo
+        if updated < len(student_ids) and delta > 0:
+            existing = cls.objects.filter(student_id__in=student_ids).values_list('student_id', flat=True)
+            cls.refresh_for_students(student_ids - set(existing))
+
+    @classmethod
+    def refresh_denominators(cls):
+        """
+        Actualizar el total de eventos y el porcentaje de TODAS las filas con un solo UPDATE.
+        Se usa cuando cambia el catálogo de eventos (solo cambia el denominador).
+        """
+        from events.models import Event
+
         total = Event.objects.filter(is_active=True).count()
+        updated = cls.objects.update(
+            total_events=total,
+            attendance_percentage=cls.percentage_expression(models.F('attended_events'), models.Value(total)),
+            last_updated=timezone.now()
+        )
+        stats_cache.invalidate_all()
+        return updated
+
+    @classmethod
+    def rebuild_all(cls, batch_size=1000):
+        """
+        Recuento completo de todas las estadísticas (ruta de reparación masiva):
+        crea las filas faltantes, recuenta asistencias con una agregación agrupada
+        en un solo UPDATE y después recalcula denominadores y porcentajes.
+        """
+        from django.db.models import Count, OuterRef, Subquery
+        from django.db.models.functions import Coalesce
+
+        missing = UserProfile.objects.filter(
+            user_type='student',
+            attendancestats__isnull=True
+        ).values_list('id', flat=True)
+
+        attended = Subquery(
+            Attendance.objects.filter(student_id=OuterRef('student_id'), is_valid=True)
+            .order_by()
+            .values('student_id')
+            .annotate(attended=Count('id'))
+            .values('attended')
+        )
+
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                [cls(student_id=student_id) for student_id in missing.iterator()],
+                batch_size=batch_size,
+                ignore_conflicts=True
+            )
+            cls.objects.update(attended_events=Coalesce(attended, 0))
+            return cls.refresh_denominators()
+
+    def update_stats(self):
+        """Recontar por completo las estadísticas de asistencia (ruta de reparación)"""
+        from events.cache import get_active_event_count  # Importar aquí para evitar circular imports
+
+        # Contar TODOS los eventos activos (valor en caché, invalidado por señales de Event)
+        total = get_active_event_count()
         
         # Contar asistencias válidas del estudiante
         attended = Attendance.objects.filter(
@@ -240,9 +392,65 @@ class AttendanceStats(models.Model):
             self.attendance_percentage = 0.0
         
         self.save()
-    
+        stats_cache.invalidate_students([self.student_id])
+
+    def is_stale(self):
+        """La fila debe recontarse si su denominador no coincide con el catálogo o es demasiado vieja"""
+        from django.conf import settings
+        from events.cache import get_active_event_count
+
+        max_age = timedelta(seconds=settings.STATS_MAX_STALENESS)
+        return (
+            self.total_events != get_active_event_count()
+            or self.last_updated < timezone.now() - max_age
+        )
+
+    @classmethod
+    def refresh_for_students(cls, student_ids):
+        """Recontar las estadísticas de varios estudiantes con un número fijo de consultas"""
+        from events.cache import get_active_event_count
+        from django.db.models import Count
+
+        student_ids = set(student_ids)
+        if not student_ids:
+            return
+
+        total = get_active_event_count()
+        attended_by_student = dict(
+            Attendance.objects.filter(student_id__in=student_ids, is_valid=True)
+            .values('student_id')
+            .annotate(attended=Count('id'))
+            .values_list('student_id', 'attended')
+        )
+
+        existing = {
+            stats.student_id: stats
+            for stats in cls.objects.filter(student_id__in=student_ids)
+        }
+        to_create = []
+        for student_id in student_ids:
+            stats = existing.get(student_id)
+            if stats is None:
+                stats = cls(student_id=student_id)
+                to_create.append(stats)
+            attended = attended_by_student.get(student_id, 0)
+            stats.total_events = total
+            stats.attended_events = attended
+            stats.attendance_percentage = round((attended / total) * 100, 2) if total > 0 else 0.0
+            stats.last_updated = timezone.now()
+
+        cls.objects.bulk_create(to_create, ignore_conflicts=True)
+        cls.objects.bulk_update(
+            list(existing.values()),
+            ['total_events', 'attended_events', 'attendance_percentage', 'last_updated']
+        )
+        stats_cache.invalidate_students(student_ids)
+
     def meets_minimum_requirement(self):
         """Verifica si cumple con el requisito mínimo de asistencia global"""
+        # Valor anotado por with_eligibility() en consultas masivas
+        if hasattr(self, 'meets_minimum'):
+            return self.meets_minimum
         from authentication.models import SystemConfiguration
         config = SystemConfiguration.get_config()
         return self.attendance_percentage >= config.minimum_attendance_percentage
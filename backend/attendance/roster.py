@@ -0,0 +1,141 @@
+"""
+Padrón en caché de un evento para estaciones de escaneo.
+
+Una estación "calienta" el padrón al abrir un evento: se guardan en el backend
+de caché (compartido entre workers) marcas por asistente con los ya registrados
+en el evento ('registered') y los estudiantes con asistencia en eventos
+simultáneos ('busy'). Así los duplicados evidentes se rechazan sin ir a la base
+de datos y solo los asistentes nuevos llegan a ella.
+
+El padrón solo puede producir falsos negativos (un asistente sin marca se valida
+en la base de datos como siempre), nunca debe producir falsos positivos: por eso
+las marcas se eliminan al invalidar o borrar una asistencia. Las claves incluyen
+la versión del catálogo de eventos, de modo que cualquier cambio en un evento
+descarta todos los padrones.
+
+Eliminar una marca solo llega a los demás workers si el backend de caché es
+compartido. Con un backend local del proceso (LocMemCache) el padrón queda
+desactivado: warm() no guarda marcas y todo se valida en la base de datos.
+"""
+from django.core.cache import cache
+from django.utils import timezone
+from events.cache import get_catalog_version
+from mac_attendance.caching import is_shared_cache
+from events.intervals import overlapping_event_ids
+
+REGISTERED = 'registered'
+BUSY = 'busy'
+MIN_TIMEOUT = 60  # segundos
+TIMEOUT_MARGIN = 5 * 60  # segundos después del fin del evento
+
+
+def _meta_key(version, event_id):
+    return f'roster:{version}:{event_id}'
+
+
+def _member_key(version, event_id, student_id=None, external_user_id=None):
+    member = f's{student_id}' if student_id else f'e{external_user_id}'
+    return f'roster:{version}:{event_id}:{member}'
+
+
+def _timeout(ends_at):
+    return max(int(ends_at - timezone.now().timestamp()) + TIMEOUT_MARGIN, MIN_TIMEOUT)
+
+
+def warm(event):
+    """Cargar el padrón del evento en la caché compartida; devuelve el número de marcas"""
+    from .models import Attendance
+
+    if not is_shared_cache():
+        return 0
+
+    version = get_catalog_version()
+    overlaps = list(overlapping_event_ids(event))
+    _, event_end = event.get_registration_window()
+    ends_at = event_end.timestamp()
+    timeout = _timeout(ends_at)
+
+    members = {}
+    busy = Attendance.objects.filter(
+        event_id__in=overlaps,
+        is_valid=True,
+        student__isnull=False
+    ).values_list('student_id', flat=True)
+    for student_id in busy:
+        members[_member_key(version, event.id, student_id=student_id)] = BUSY
+
+    registered = Attendance.objects.filter(event=event, is_valid=True).values_list('student_id', 'external_user_id')
+    for student_id, external_user_id in registered:
+        members[_member_key(version, event.id, student_id, external_user_id)] = REGISTERED
+
+    cache.set_many(members, timeout)
+    # La marca de "padrón caliente" se escribe al final, cuando ya están todas las marcas
+    cache.set(_meta_key(version, event.id), {'overlaps': overlaps, 'ends_at': ends_at}, timeout)
+    return len(members)
+
+
+def check(event_id, attendees):
+    """
+    Consultar el padrón para varios asistentes [(student_id, external_user_id), ...].
+    Devuelve {asistente: REGISTERED | BUSY} solo para los que tienen marca;
+    si el padrón no está caliente devuelve {} y todo se valida en la base de datos.
+    """
+    if not is_shared_cache():
+        return {}
+    version = get_catalog_version()
+    meta_key = _meta_key(version, event_id)
+    keys = {_member_key(version, event_id, *attendee): attendee for attendee in attendees}
+
+    found = cache.get_many([meta_key, *keys])
+    if meta_key not in found:
+        return {}
+    return {keys[key]: status for key, status in found.items() if key != meta_key}
+
+
+def record(event_id, attendees):
+    """Marcar asistencias recién confirmadas en el padrón del evento y de sus simultáneos"""
+    if not is_shared_cache():
+        return
+    version = get_catalog_version()
+    meta = cache.get(_meta_key(version, event_id))
+    if meta is None:
+        return
+
+    timeout = _timeout(meta['ends_at'])
+    cache.set_many({
+        _member_key(version, event_id, *attendee): REGISTERED
+        for attendee in attendees
+    }, timeout)
+
+    students = [student_id for student_id, _ in attendees if student_id]
+    if not students or not meta['overlaps']:
+        return
+    overlap_metas = cache.get_many([_meta_key(version, overlap_id) for overlap_id in meta['overlaps']])
+    for overlap_id in meta['overlaps']:
+        overlap_meta = overlap_metas.get(_meta_key(version, overlap_id))
+        if overlap_meta is None:
+            continue
+        for student_id in students:
+            # add() no pisa una marca REGISTERED existente
+            cache.add(_member_key(version, overlap_id, student_id=student_id), BUSY, _timeout(overlap_meta['ends_at']))
+
+
+def forget(event_id, student_id=None, external_user_id=None):
+    """Quitar las marcas de una asistencia invalidada o eliminada"""
+    from events.models import Event
+
+    if not is_shared_cache():
+        return
+
+    version = get_catalog_version()
+    keys = [_member_key(version, event_id, student_id, external_user_id)]
+    if student_id:
+        # Las marcas BUSY en eventos simultáneos deben irse aunque este padrón esté frío
+        meta = cache.get(_meta_key(version, event_id))
+        if meta is not None:
+            overlaps = meta['overlaps']
+        else:
+            event = Event.objects.filter(pk=event_id).first()
+            overlaps = list(overlapping_event_ids(event)) if event else []
+        keys += [_member_key(version, overlap_id, student_id=student_id) for overlap_id in overlaps]
+    cache.delete_many(keys)
@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from events.models import Event
+from . import live, roster
+from .models import Attendance, AttendanceStats
+
+
+@receiver(post_save, sender=Attendance)
+def broadcast_new_attendance(sender, instance, created, **kwargs):
+    """Enviar la asistencia nueva a los tableros en vivo al confirmarse"""
+    if created and instance.is_valid:
+        # La vista de registro deja el nombre que ya resolvió (ver register_attendance)
+        attendee_name = getattr(instance, 'live_attendee_name', None)
+        live.publish_on_commit([live.attendance_payload(instance, attendee_name=attendee_name)])
+
+
+@receiver(post_delete, sender=Attendance)
+def discount_deleted_attendance(sender, instance, **kwargs):
+    """Descontar de las estadísticas una asistencia válida eliminada (también en cascada)"""
+    if instance.student_id and instance.is_valid:
+        AttendanceStats.apply_attendance_delta([instance.student_id], -1)
+
+
+@receiver(post_delete, sender=Attendance)
+def forget_deleted_attendance(sender, instance, **kwargs):
+    """Quitar del padrón en caché una asistencia válida eliminada"""
+    if instance.is_valid:
+        roster.forget(instance.event_id, instance.student_id, instance.external_user_id)
+
+
+def _refresh_denominators():
+    AttendanceStats.refresh_denominators()
+
+
+def refresh_denominators_on_commit():
+    """
+    Programar el recálculo de denominadores una sola vez por transacción: borrar o
+    activar N eventos desde el admin no debe reescribir N veces todas las filas
+    """
+    connection = transaction.get_connection()
+    if connection.in_atomic_block and any(
+        callback is _refresh_denominators for _, callback, _ in connection.run_on_commit
+    ):
+        return
+    transaction.on_commit(_refresh_denominators)
+
+
+@receiver(post_save, sender=Event)
+def refresh_stats_on_event_save(sender, instance, created, **kwargs):
+    """Recalcular porcentajes cuando un evento entra o sale del catálogo activo"""
+    was_active = False if created else getattr(instance, '_loaded_is_active', None)
+    if was_active != instance.is_active:
+        refresh_denominators_on_commit()
+    instance._loaded_is_active = instance.is_active
+
+
+@receiver(post_delete, sender=Event)
+def refresh_stats_on_event_delete(sender, instance, **kwargs):
+    """Recalcular porcentajes cuando se elimina un evento activo"""
+    if instance.is_active:
+        refresh_denominators_on_commit()
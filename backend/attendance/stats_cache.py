@@ -0,0 +1,94 @@
+"""
+Instantáneas en caché de AttendanceStats para servir lecturas sin ir a la base de datos.
+
+Cada estudiante tiene una instantánea con los valores de su fila de estadísticas
+y su fecha de actualización (de donde salen ETag y Last-Modified). Las rutas que
+modifican filas sueltas borran la instantánea del estudiante; las que recalculan
+todas las filas incrementan una versión global incluida en las claves, lo que
+descarta todas las instantáneas de golpe.
+"""
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+STATS_VERSION_KEY = 'attendance:stats_version'
+SNAPSHOT_KEY = 'attendance:stats:{version}:{student_id}'
+
+
+def _initial_version():
+    return int(time.time() * 1000)
+
+
+def get_stats_version():
+    version = cache.get(STATS_VERSION_KEY)
+    if version is None:
+        cache.add(STATS_VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(STATS_VERSION_KEY)
+    return version
+
+
+def _bump_stats_version():
+    try:
+        cache.incr(STATS_VERSION_KEY)
+    except ValueError:
+        cache.set(STATS_VERSION_KEY, _initial_version(), timeout=None)
+
+
+def _delete_snapshots(student_ids):
+    version = get_stats_version()
+    cache.delete_many([SNAPSHOT_KEY.format(version=version, student_id=student_id) for student_id in student_ids])
+
+
+def get_snapshot(student_id):
+    return cache.get(SNAPSHOT_KEY.format(version=get_stats_version(), student_id=student_id))
+
+
+def set_snapshot(stats):
+    """Guardar la instantánea de una fila de estadísticas y devolverla"""
+    snapshot = {
+        'total_events': stats.total_events,
+        'attended_events': stats.attended_events,
+        'attendance_percentage': stats.attendance_percentage,
+        'last_updated': stats.last_updated,
+    }
+    cache.set(
+        SNAPSHOT_KEY.format(version=get_stats_version(), student_id=stats.student_id),
+        snapshot,
+        settings.STATS_CACHE_TTL
+    )
+    return snapshot
+
+
+def invalidate_students(student_ids):
+    """Descartar las instantáneas de los estudiantes ahora y al confirmar la transacción"""
+    student_ids = list(student_ids)
+    if not student_ids:
+        return
+    _delete_snapshots(student_ids)
+    # Una lectura concurrente pudo guardar los valores anteriores antes del commit
+    transaction.on_commit(lambda: _delete_snapshots(student_ids))
+
+
+def invalidate_all():
+    """Descartar todas las instantáneas (recálculos masivos)"""
+    _bump_stats_version()
+    transaction.on_commit(_bump_stats_version)
+
+
+def load_snapshot(student_id):
+    """
+    Instantánea de las estadísticas de un estudiante. Se sirve de la caché si existe;
+    si no, de la fila guardada, que solo se reconta cuando falta o está vencida.
+    """
+    from .models import AttendanceStats
+
+    snapshot = get_snapshot(student_id)
+    if snapshot is not None:
+        return snapshot
+
+    stats = AttendanceStats.objects.filter(student_id=student_id).first()
+    if stats is None or stats.is_stale():
+        AttendanceStats.refresh_for_students([student_id])
+        stats = AttendanceStats.objects.get(student_id=student_id)
+    return set_snapshot(stats)
@@ -3,6 +3,11 @@ from . import views
 
 urlpatterns = [
     path('', views.register_attendance, name='register_attendance'),
+    path('batch/', views.register_attendance_batch, name='register_attendance_batch'),
+    path('roster/warm/', views.warm_event_roster, name='warm_event_roster'),
     path('stats/', views.get_student_stats, name='student_stats'),
+    path('stats/batch/', views.get_student_stats_batch, name='student_stats_batch'),
     path('recent/', views.get_recent_attendances, name='recent_attendances'),
+    path('stream/', views.attendance_stream, name='attendance_stream'),
+    path('stream/token/', views.attendance_stream_token, name='attendance_stream_token'),
 ]
\ No newline at end of file
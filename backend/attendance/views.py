@@ -1,11 +1,26 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, renderer_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from datetime import datetime
+from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import (
+    http_date, parse_http_date_safe, quote_etag, urlsafe_base64_decode, urlsafe_base64_encode
+)
 from django_ratelimit.decorators import ratelimit
-from authentication.models import UserProfile, ExternalUser
+from authentication.attendee_cache import resolve_attendee, resolve_attendees
+from authentication.models import SystemConfiguration
+from events.cache import get_active_event_count
 from events.models import Event
+from events.intervals import overlapping_event_ids
+from . import live, roster, stats_cache
 from .models import Attendance, AttendanceStats
 
 @api_view(['GET', 'POST'])
@@ -39,6 +54,13 @@ def register_attendance(request):
         return Response({
             'error': 'Se requiere event_id y account_number'
         }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        event_id = int(event_id)
+    except (TypeError, ValueError):
+        return Response({
+            'error': 'event_id debe ser un ID de evento'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
     # Buscar evento
     try:
@@ -48,74 +70,312 @@ def register_attendance(request):
             'error': 'Evento no encontrado'
         }, status=status.HTTP_404_NOT_FOUND)
     
-    # Buscar estudiante regular o usuario externo
-    student_profile = None
-    external_user = None
-    attendee_name = None
-
-    # Primero buscar en estudiantes regulares
-    try:
-        student_profile = UserProfile.objects.get(
-            account_number=account_number,
-            user_type='student'
-        )
-        attendee_name = student_profile.full_name
-    except UserProfile.DoesNotExist:
-        # Si no es estudiante, buscar en usuarios externos
-        try:
-            external_user = ExternalUser.objects.get(
-                account_number=account_number,
-                status='approved'
-            )
-            attendee_name = external_user.full_name
-        except ExternalUser.DoesNotExist:
-            return Response({
-                'error': f'Usuario con número de cuenta {account_number} no encontrado o no aprobado'
-            }, status=status.HTTP_404_NOT_FOUND)
+    # Resolver estudiante regular o usuario externo aprobado (caché en proceso o directorio)
+    entry = resolve_attendee(account_number)
+    if entry is None or not entry.is_attendee:
+        return Response({
+            'error': f'Usuario con número de cuenta {account_number} no encontrado o no aprobado'
+        }, status=status.HTTP_404_NOT_FOUND)
 
     # Usar el asistente autenticado como registrador
     assistant_profile = registrar_profile
 
-    # Verificar si ya tiene asistencia
-    if student_profile:
-        if Attendance.objects.filter(student=student_profile, event=event, is_valid=True).exists():
-            return Response({
-                'error': 'El estudiante ya tiene asistencia registrada para este evento'
-            }, status=status.HTTP_400_BAD_REQUEST)
-    elif external_user:
-        if Attendance.objects.filter(external_user=external_user, event=event, is_valid=True).exists():
-            return Response({
-                'error': 'El usuario externo ya tiene asistencia registrada para este evento'
-            }, status=status.HTTP_400_BAD_REQUEST)
+    # Rechazar duplicados evidentes con el padrón en caché (si la estación lo calentó)
+    attendee = (entry.profile_id, entry.external_user_id)
+    roster_status = roster.check(event.id, [attendee]).get(attendee)
+    if roster_status == roster.REGISTERED:
+        who = 'Este estudiante' if entry.kind == 'student' else 'Este usuario externo'
+        return Response({
+            'error': f'{who} ya tiene asistencia registrada para este evento.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if roster_status == roster.BUSY:
+        return Response({
+            'error': 'El estudiante ya tiene asistencia registrada en un evento simultáneo.'
+        }, status=status.HTTP_400_BAD_REQUEST)
 
-    # Crear asistencia
+    # Crear asistencia (los duplicados los rechaza la restricción única al insertar)
     try:
-        attendance = Attendance.objects.create(
-            student=student_profile,
-            external_user=external_user,
+        attendance = Attendance(
+            student_id=entry.profile_id,
+            external_user_id=entry.external_user_id,
             event=event,
             registered_by=assistant_profile,
             registration_method='manual'
         )
+        # Nombre ya resuelto: la publicación en el flujo en vivo no vuelve a consultarlo
+        attendance.live_attendee_name = entry.full_name
+        attendance.save(force_insert=True)
 
         return Response({
-            'message': f'Asistencia registrada para {attendee_name}',
+            'message': f'Asistencia registrada para {entry.full_name}',
             'attendance_id': attendance.id,
             'event': event.title,
             'registered_by': assistant_profile.full_name,
-            'attendee_type': 'student' if student_profile else 'external'
+            'attendee_type': entry.kind
         }, status=status.HTTP_201_CREATED)
 
+    except ValidationError as e:
+        return Response({
+            'error': e.messages[0]
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'error': f'Error al crear asistencia: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+MAX_BATCH_SIZE = 200
+MAX_STATS_BATCH_SIZE = 500
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@ratelimit(key='user', rate='30/m', method='POST', block=True)
+def register_attendance_batch(request):
+    """Registrar asistencia de varios usuarios a un evento - Solo asistentes: 30 lotes por minuto"""
+    try:
+        registrar_profile = request.user.userprofile
+        if registrar_profile.user_type != 'assistant':
+            return Response({
+                'error': 'Solo los asistentes pueden registrar asistencias'
+            }, status=status.HTTP_403_FORBIDDEN)
+    except:
+        return Response({
+            'error': 'Usuario sin perfil válido'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    event_id = request.data.get('event_id')
+    account_numbers = request.data.get('account_numbers')
+
+    if not event_id or not isinstance(account_numbers, list) or not account_numbers:
+        return Response({
+            'error': 'Se requiere event_id y una lista account_numbers'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        event_id = int(event_id)
+    except (TypeError, ValueError):
+        return Response({
+            'error': 'event_id debe ser un ID de evento'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if len(account_numbers) > MAX_BATCH_SIZE:
+        return Response({
+            'error': f'Máximo {MAX_BATCH_SIZE} números de cuenta por lote'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    registration_method = request.data.get('registration_method', 'barcode')
+    if registration_method not in dict(Attendance.REGISTRATION_METHODS):
+        return Response({
+            'error': 'Método de registro inválido'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        event = Event.objects.get(id=event_id, is_active=True)
+    except Event.DoesNotExist:
+        return Response({
+            'error': 'Evento no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    # La ventana de registro es la misma para todo el lote
+    try:
+        Attendance.check_registration_window(event)
+    except ValidationError as e:
+        return Response({'error': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Normalizar y descartar repetidos dentro del mismo lote
+    results = {}
+    requested = []
+    for raw in account_numbers:
+        account_number = str(raw).strip()
+        if account_number in results:
+            continue
+        results[account_number] = None
+        requested.append(account_number)
+
+    # Resolver estudiantes y usuarios externos aprobados (caché y, para el resto, una sola consulta)
+    attendees = {
+        account_number: (entry.kind, entry.profile_id or entry.external_user_id, entry.full_name)
+        for account_number, entry in resolve_attendees(requested).items()
+        if entry.is_attendee
+    }
+
+    # Primero el padrón en caché: los duplicados evidentes no llegan a la base de datos
+    marked = roster.check(event.id, [
+        (pk, None) if kind == 'student' else (None, pk)
+        for kind, pk, _ in attendees.values()
+    ])
+    roster_registered = {attendee for attendee, mark in marked.items() if mark == roster.REGISTERED}
+    roster_busy = {attendee[0] for attendee, mark in marked.items() if mark == roster.BUSY}
+
+    student_ids = {
+        pk for kind, pk, _ in attendees.values()
+        if kind == 'student' and (pk, None) not in marked
+    }
+    external_ids = {
+        pk for kind, pk, _ in attendees.values()
+        if kind == 'external' and (None, pk) not in marked
+    }
+
+    # Duplicados en este evento y asistencias en eventos simultáneos, como conjuntos
+    already_registered = set(
+        Attendance.objects.filter(event=event, is_valid=True).filter(
+            Q(student_id__in=student_ids) | Q(external_user_id__in=external_ids)
+        ).values_list('student_id', 'external_user_id')
+    )
+    registered_students = {s for s, _ in already_registered if s} | {s for s, _ in roster_registered if s}
+    registered_externals = {e for _, e in already_registered if e} | {e for _, e in roster_registered if e}
+
+    overlapping_ids = overlapping_event_ids(event)
+    candidates = student_ids - registered_students
+    busy_students = roster_busy
+    if overlapping_ids and candidates:
+        busy_students = busy_students | set(
+            Attendance.objects.filter(
+                student_id__in=candidates,
+                event_id__in=overlapping_ids,
+                is_valid=True
+            ).values_list('student_id', flat=True)
+        )
+
+    to_create = []
+    for account_number in requested:
+        attendee = attendees.get(account_number)
+        if attendee is None:
+            results[account_number] = {
+                'status': 'not_found',
+                'error': f'Usuario con número de cuenta {account_number} no encontrado o no aprobado'
+            }
+            continue
+
+        kind, pk, full_name = attendee
+        if (kind == 'student' and pk in registered_students) or (kind == 'external' and pk in registered_externals):
+            results[account_number] = {
+                'status': 'duplicate',
+                'error': 'Ya tiene asistencia registrada para este evento'
+            }
+        elif kind == 'student' and pk in busy_students:
+            results[account_number] = {
+                'status': 'simultaneous',
+                'error': 'El estudiante ya tiene asistencia registrada en un evento simultáneo'
+            }
+        else:
+            to_create.append((account_number, Attendance(
+                student_id=pk if kind == 'student' else None,
+                external_user_id=pk if kind == 'external' else None,
+                event=event,
+                registered_by=registrar_profile,
+                registration_method=registration_method
+            )))
+
+    pending = [attendance for _, attendance in to_create]
+    try:
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    Attendance.objects.bulk_create(pending)
+            except IntegrityError:
+                # Otra estación registró a alguien del lote al mismo tiempo:
+                # insertar uno por uno y dejar que la restricción única marque los duplicados
+                for attendance in pending:
+                    try:
+                        with transaction.atomic():
+                            Attendance.objects.bulk_create([attendance])
+                    except IntegrityError:
+                        attendance.pk = None
+
+            created = [attendance for attendance in pending if attendance.pk]
+            AttendanceStats.apply_attendance_delta(
+                [attendance.student_id for attendance in created if attendance.student_id], 1
+            )
+            new_attendees = [(attendance.student_id, attendance.external_user_id) for attendance in created]
+            transaction.on_commit(lambda: roster.record(event.id, new_attendees))
+            # bulk_create no envía post_save: publicar en el flujo en vivo aquí
+            live.publish_on_commit(
+                live.attendance_payload(
+                    attendance,
+                    attendee_name=attendees[account_number][2],
+                    event_title=event.title,
+                    registered_by=registrar_profile.full_name
+                )
+                for account_number, attendance in to_create if attendance.pk
+            )
+    except Exception as e:
+        return Response({
+            'error': f'Error al crear asistencias: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    for account_number, attendance in to_create:
+        kind, _, full_name = attendees[account_number]
+        if not attendance.pk:
+            results[account_number] = {
+                'status': 'duplicate',
+                'error': 'Ya tiene asistencia registrada para este evento'
+            }
+            continue
+        results[account_number] = {
+            'status': 'registered',
+            'attendance_id': attendance.id,
+            'attendee_name': full_name,
+            'attendee_type': kind
+        }
+
+    return Response({
+        'event': event.title,
+        'registered_by': registrar_profile.full_name,
+        'registered': len(created),
+        'failed': len(requested) - len(created),
+        'results': [
+            {'account_number': account_number, **results[account_number]}
+            for account_number in requested
+        ]
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@ratelimit(key='user', rate='30/m', method='POST', block=True)
+def warm_event_roster(request):
+    """Cargar el padrón del evento en caché al abrir una estación de escaneo - Solo asistentes"""
+    try:
+        registrar_profile = request.user.userprofile
+        if registrar_profile.user_type != 'assistant':
+            return Response({
+                'error': 'Solo los asistentes pueden abrir estaciones de registro'
+            }, status=status.HTTP_403_FORBIDDEN)
+    except:
+        return Response({
+            'error': 'Usuario sin perfil válido'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    event_id = request.data.get('event_id')
+    if not event_id:
+        return Response({
+            'error': 'Se requiere event_id'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        event_id = int(event_id)
+    except (TypeError, ValueError):
+        return Response({
+            'error': 'event_id debe ser un ID de evento'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        event = Event.objects.get(id=event_id, is_active=True)
+    except Event.DoesNotExist:
+        return Response({
+            'error': 'Evento no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({
+        'event': event.title,
+        'roster_size': roster.warm(event)
+    })
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 @ratelimit(key='user', rate='30/m', method='GET', block=True)
 def get_student_stats(request):
-    """Obtener estadísticas de estudiante: 30 consultas por minuto"""
+    """Obtener estadísticas de estudiante (con ETag/Last-Modified): 30 consultas por minuto"""
     account_number = request.GET.get('account_number')
 
     if not account_number:
@@ -141,29 +401,142 @@ def get_student_stats(request):
             'error': 'Usuario sin perfil válido'
         }, status=status.HTTP_403_FORBIDDEN)
 
+    entry = resolve_attendee(account_number)
+    if entry is None or entry.kind != 'student':
+        return Response({'error': 'Estudiante no encontrado'}, status=404)
+
+    # Se sirve la fila guardada (mantenida por incrementos) o su instantánea en caché
+    snapshot = stats_cache.load_snapshot(entry.profile_id)
+    last_updated = snapshot['last_updated']
+    etag = quote_etag(f"{entry.profile_id}-{int(last_updated.timestamp() * 1000000)}")
+    last_modified = http_date(last_updated.timestamp())
+
+    if_none_match = request.headers.get('If-None-Match')
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    if if_none_match:
+        not_modified = etag in [tag.strip() for tag in if_none_match.split(',')]
+    else:
+        not_modified = if_modified_since is not None and int(last_updated.timestamp()) <= if_modified_since
+
+    if not_modified:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response({
+            'total_events': snapshot['total_events'],
+            'attended_events': snapshot['attended_events'],
+            'attendance_percentage': snapshot['attendance_percentage']
+        })
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@ratelimit(key='user', rate='10/m', method='POST', block=True)
+def get_student_stats_batch(request):
+    """Estadísticas y elegibilidad de varios estudiantes - Solo asistentes: 10 lotes por minuto"""
     try:
-        student_profile = UserProfile.objects.get(
-            account_number=account_number,
-            user_type='student'
-        )
-        stats, created = AttendanceStats.objects.get_or_create(
-            student=student_profile
-        )
-        stats.update_stats()
+        requester_profile = request.user.userprofile
+        if requester_profile.user_type != 'assistant':
+            return Response({
+                'error': 'Solo los asistentes pueden consultar estadísticas por lote'
+            }, status=status.HTTP_403_FORBIDDEN)
+    except:
+        return Response({
+            'error': 'Usuario sin perfil válido'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    account_numbers = request.data.get('account_numbers')
+    if not isinstance(account_numbers, list) or not account_numbers:
+        return Response({
+            'error': 'Se requiere una lista account_numbers'
+        }, status=status.HTTP_400_BAD_REQUEST)
 
+    if len(account_numbers) > MAX_STATS_BATCH_SIZE:
         return Response({
-            'total_events': stats.total_events,
-            'attended_events': stats.attended_events,
-            'attendance_percentage': stats.attendance_percentage
+            'error': f'Máximo {MAX_STATS_BATCH_SIZE} números de cuenta por consulta'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    requested = list(dict.fromkeys(str(value).strip() for value in account_numbers if str(value).strip()))
+    attendees = resolve_attendees(requested)
+    students = {
+        account_number: attendee
+        for account_number, attendee in attendees.items()
+        if attendee.kind == 'student'
+    }
+
+    # Una sola agregación para todos los estudiantes; el total y el umbral se leen una vez
+    attended_by_student = dict(
+        Attendance.objects.filter(
+            student_id__in=[attendee.profile_id for attendee in students.values()],
+            is_valid=True
+        )
+        .values('student_id')
+        .annotate(attended=Count('id'))
+        .values_list('student_id', 'attended')
+    )
+    total = get_active_event_count()
+    minimum = SystemConfiguration.get_config().minimum_attendance_percentage
+
+    results = []
+    for account_number in requested:
+        attendee = students.get(account_number)
+        if attendee is None:
+            results.append({
+                'account_number': account_number,
+                'error': 'Estudiante no encontrado'
+            })
+            continue
+
+        attended = attended_by_student.get(attendee.profile_id, 0)
+        percentage = round((attended / total) * 100, 2) if total > 0 else 0.0
+        results.append({
+            'account_number': account_number,
+            'full_name': attendee.full_name,
+            'total_events': total,
+            'attended_events': attended,
+            'attendance_percentage': percentage,
+            'meets_minimum': percentage >= minimum
         })
-    except UserProfile.DoesNotExist:
-        return Response({'error': 'Estudiante no encontrado'}, status=404)
+
+    return Response({
+        'total_events': total,
+        'minimum_attendance_percentage': minimum,
+        'results': results
+    })
+
+DEFAULT_RECENT_PAGE_SIZE = 20
+MAX_RECENT_PAGE_SIZE = 100
+
+
+def encode_recent_cursor(attendance):
+    """Cursor opaco con la posición (timestamp, id) de la última asistencia de una página"""
+    raw = f'{attendance.timestamp.isoformat()}|{attendance.pk}'
+    return urlsafe_base64_encode(raw.encode())
+
+
+def decode_recent_cursor(cursor):
+    """Devuelve (timestamp, id) o lanza ValueError si el cursor no es válido"""
+    try:
+        timestamp, pk = urlsafe_base64_decode(cursor).decode().split('|')
+        timestamp = datetime.fromisoformat(timestamp)
+    except (TypeError, UnicodeDecodeError):
+        raise ValueError(cursor)
+    if timezone.is_naive(timestamp):
+        raise ValueError(cursor)
+    return timestamp, int(pk)
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 @ratelimit(key='user', rate='60/m', method='GET', block=True)
 def get_recent_attendances(request):
-    """Obtener asistencias recientes - Solo asistentes: 60 consultas por minuto"""
+    """
+    Obtener asistencias recientes - Solo asistentes: 60 consultas por minuto.
+    Paginación por cursor sobre (timestamp, id), de la más reciente a la más antigua.
+    Parámetros opcionales: event (ID de evento), limit y cursor (next_cursor de la página anterior).
+    """
     # Solo asistentes pueden ver asistencias recientes
     try:
         requester_profile = request.user.userprofile
@@ -176,14 +549,109 @@ def get_recent_attendances(request):
             'error': 'Usuario sin perfil válido'
         }, status=status.HTTP_403_FORBIDDEN)
 
-    recent = Attendance.objects.select_related('student', 'event').order_by('-timestamp')[:5]
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_RECENT_PAGE_SIZE))
+        event_id = request.query_params.get('event')
+        event_id = int(event_id) if event_id is not None else None
+    except ValueError:
+        return Response({
+            'error': 'limit y event deben ser números enteros'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, MAX_RECENT_PAGE_SIZE))
+
+    recent = Attendance.objects.select_related(
+        'student', 'external_user', 'event', 'registered_by'
+    ).order_by('-timestamp', '-id')
+    if event_id is not None:
+        recent = recent.filter(event_id=event_id)
 
-    data = []
-    for attendance in recent:
-        data.append({
-            'attendee_name': attendance.attendee_name,
-            'event_title': attendance.event.title,
-            'timestamp': attendance.timestamp.strftime('%H:%M')
-        })
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        try:
+            timestamp, pk = decode_recent_cursor(cursor)
+        except ValueError:
+            return Response({
+                'error': 'Cursor inválido'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        recent = recent.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk))
+
+    # Una fila extra indica si hay página siguiente sin contar el total
+    page = list(recent[:limit + 1])
+    next_cursor = encode_recent_cursor(page[limit - 1]) if len(page) > limit else None
+
+    return Response({
+        'results': [live.attendance_payload(attendance) for attendance in page[:limit]],
+        'next_cursor': next_cursor
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@ratelimit(key='user', rate='10/m', method='POST', block=True)
+def attendance_stream_token(request):
+    """Token de corta duración para abrir el flujo en vivo con EventSource - Solo asistentes"""
+    try:
+        requester_profile = request.user.userprofile
+        if requester_profile.user_type != 'assistant':
+            return Response({
+                'error': 'Solo los asistentes pueden ver el flujo de asistencias'
+            }, status=status.HTTP_403_FORBIDDEN)
+    except:
+        return Response({
+            'error': 'Usuario sin perfil válido'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    return Response({
+        'token': live.issue_stream_token(request.user),
+        'expires_in': settings.ATTENDANCE_STREAM_TOKEN_TTL
+    })
+
+
+@api_view(['GET'])
+@authentication_classes([live.StreamTokenAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+@renderer_classes([live.EventStreamRenderer, *api_settings.DEFAULT_RENDERER_CLASSES])
+@permission_classes([IsAuthenticated])
+@ratelimit(key='user', rate='10/m', method='GET', block=True)
+def attendance_stream(request):
+    """
+    Flujo en vivo (Server-Sent Events) de asistencias nuevas - Solo asistentes.
+    Parámetros: token (de stream/token/, para EventSource), event (opcional, filtra
+    por evento) y last_event_id (opcional, como el encabezado Last-Event-ID).
+    """
+    try:
+        requester_profile = request.user.userprofile
+        if requester_profile.user_type != 'assistant':
+            return Response({
+                'error': 'Solo los asistentes pueden ver el flujo de asistencias'
+            }, status=status.HTTP_403_FORBIDDEN)
+    except:
+        return Response({
+            'error': 'Usuario sin perfil válido'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    event_id = request.query_params.get('event')
+    if event_id is not None:
+        try:
+            event_id = int(event_id)
+        except ValueError:
+            return Response({
+                'error': 'event debe ser un ID de evento'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    # EventSource envía el último id recibido al reconectarse; al abrir una conexión
+    # nueva (con otro token) el cliente lo manda como parámetro
+    last_event_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    stream = live.open_stream(event_id, last_event_id)
+    if stream is None:
+        response = Response({
+            'error': 'Demasiadas conexiones al flujo en vivo. Intenta más tarde.'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = str(settings.ATTENDANCE_STREAM_RETRY_MS // 1000)
+        return response
 
-    return Response(data)
\ No newline at end of file
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Sin búfer en nginx
+    return response
@@ -1,13 +1,22 @@
 from django.contrib import admin
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User, Group
 from django import forms
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils.html import format_html
-from django.http import HttpResponse
 from import_export import resources, fields
 from import_export.admin import ImportExportModelAdmin
+from import_export.results import RowResult
 from import_export.widgets import ForeignKeyWidget
+from mac_attendance.exports import StreamingExportMixin
+from mac_attendance.imports import DryRunCacheAdminMixin, DryRunCacheResourceMixin
 from .models import UserProfile, Asistente, ExternalUser, SystemConfiguration, Student, AssistantProfile
 from .audit import AuditLog
+from .bruteforce import DIMENSIONS, detector
+from .roster_validation import clean_cell, validate_roster
 
 # Ocultar modelos de Django que no se usan
 admin.site.unregister(User)
@@ -16,8 +25,42 @@ admin.site.unregister(Group)
 
 # ===== RECURSOS PARA IMPORT/EXPORT =====
 
-class StudentResource(resources.ModelResource):
+class RosterPrevalidationMixin:
+    """
+    Validar todo el archivo por conjuntos antes de importar cualquier fila.
+    Si hay errores, las filas con error se reportan como inválidas y el resto
+    se omite sin consultar la base de datos, así que no se escribe nada.
+    """
+    roster_user_type = None
+
+    def before_import(self, dataset, **kwargs):
+        super().before_import(dataset, **kwargs)
+        self._roster_errors = {}
+        headers = dataset.headers or []
+        if 'account_number' not in headers:
+            return
+        full_names = dataset['full_name'] if 'full_name' in headers else [''] * dataset.height
+        _, errors = validate_roster(dataset['account_number'], full_names, self.roster_user_type, first_row=1)
+        for row_number, message in errors:
+            self._roster_errors.setdefault(row_number, []).append(message)
+
+    def import_row(self, row, instance_loader, **kwargs):
+        if not getattr(self, '_roster_errors', None):
+            return super().import_row(row, instance_loader, **kwargs)
+
+        row_result = self.get_row_result_class()()
+        messages = self._roster_errors.get(kwargs.get('row_number'))
+        if messages:
+            row_result.import_type = RowResult.IMPORT_TYPE_INVALID
+            row_result.validation_error = ValidationError({'account_number': messages})
+        else:
+            row_result.import_type = RowResult.IMPORT_TYPE_SKIP
+        return row_result
+
+
+class StudentResource(RosterPrevalidationMixin, DryRunCacheResourceMixin, resources.ModelResource):
     """Recurso para importar/exportar SOLO estudiantes"""
+    roster_user_type = 'student'
 
     class Meta:
         model = UserProfile
@@ -30,34 +73,24 @@ class StudentResource(resources.ModelResource):
     def before_import_row(self, row, **kwargs):
         """Validar y limpiar datos antes de importar"""
         # Limpiar espacios
-        row['account_number'] = str(row.get('account_number', '')).strip()
+        row['account_number'] = clean_cell(row.get('account_number'))
         row['full_name'] = str(row.get('full_name', '')).strip()
         # Asignar automáticamente user_type como student
         row['user_type'] = 'student'
 
-    def after_save_instance(self, instance, using_transactions, dry_run):
-        """Crear usuario de Django si no existe y asegurar que sea estudiante"""
-        if not dry_run:
-            # Asegurar que sea estudiante
-            if instance.user_type != 'student':
-                instance.user_type = 'student'
-                instance.save()
-
-            # Crear usuario de Django si no existe
-            if not instance.user_id:
-                user = User.objects.create_user(
-                    username=instance.account_number,
-                    first_name=instance.full_name,
-                    password=None
-                )
-                user.set_unusable_password()
-                user.save()
-                instance.user = user
-                instance.save()
+    def before_save_instance(self, instance, row, **kwargs):
+        """Asegurar que sea estudiante y crear su usuario de Django antes del único guardado del perfil"""
+        instance.user_type = 'student'
+        if not instance.user_id:
+            instance.user, _ = User.objects.get_or_create(
+                username=instance.account_number,
+                defaults={'first_name': instance.full_name[:150], 'password': make_password(None)}
+            )
 
 
-class AssistantResource(resources.ModelResource):
+class AssistantResource(RosterPrevalidationMixin, DryRunCacheResourceMixin, resources.ModelResource):
     """Recurso para importar/exportar SOLO asistentes"""
+    roster_user_type = 'assistant'
 
     class Meta:
         model = UserProfile
@@ -70,30 +103,19 @@ class AssistantResource(resources.ModelResource):
     def before_import_row(self, row, **kwargs):
         """Validar y limpiar datos antes de importar"""
         # Limpiar espacios
-        row['account_number'] = str(row.get('account_number', '')).strip()
+        row['account_number'] = clean_cell(row.get('account_number'))
         row['full_name'] = str(row.get('full_name', '')).strip()
         # Asignar automáticamente user_type como assistant
         row['user_type'] = 'assistant'
 
-    def after_save_instance(self, instance, using_transactions, dry_run):
-        """Crear usuario de Django si no existe y asegurar que sea asistente"""
-        if not dry_run:
-            # Asegurar que sea asistente
-            if instance.user_type != 'assistant':
-                instance.user_type = 'assistant'
-                instance.save()
-
-            # Crear usuario de Django si no existe
-            if not instance.user_id:
-                user = User.objects.create_user(
-                    username=instance.account_number,
-                    first_name=instance.full_name,
-                    password=None
-                )
-                user.set_unusable_password()
-                user.save()
-                instance.user = user
-                instance.save()
+    def before_save_instance(self, instance, row, **kwargs):
+        """Asegurar que sea asistente y crear su usuario de Django antes del único guardado del perfil"""
+        instance.user_type = 'assistant'
+        if not instance.user_id:
+            instance.user, _ = User.objects.get_or_create(
+                username=instance.account_number,
+                defaults={'first_name': instance.full_name[:150], 'password': make_password(None)}
+            )
 
 
 class UserProfileResource(resources.ModelResource):
@@ -109,7 +131,7 @@ class UserProfileResource(resources.ModelResource):
     def before_import_row(self, row, **kwargs):
         """Validar y limpiar datos antes de importar"""
         # Limpiar espacios
-        row['account_number'] = str(row.get('account_number', '')).strip()
+        row['account_number'] = clean_cell(row.get('account_number'))
         row['full_name'] = str(row.get('full_name', '')).strip()
         row['user_type'] = str(row.get('user_type', '')).strip().lower()
 
@@ -176,12 +198,13 @@ class UserProfileForm(forms.ModelForm):
         return profile
 
 
-class StudentAdmin(ImportExportModelAdmin):
+class StudentAdmin(DryRunCacheAdminMixin, StreamingExportMixin, ImportExportModelAdmin):
     """Admin SOLO para estudiantes"""
     resource_class = StudentResource
     list_display = ['account_number', 'full_name']
     search_fields = ['account_number', 'full_name']
-    actions = ['export_selected_students']
+    actions = ['export_selected_students', 'export_selected_csv', 'export_selected_jsonl']
+    streaming_export_filename = 'estudiantes'
 
     fieldsets = (
         ('Información del Estudiante', {
@@ -207,21 +230,7 @@ class StudentAdmin(ImportExportModelAdmin):
 
     def export_selected_students(self, request, queryset):
         """Acción para exportar estudiantes seleccionados"""
-        resource = StudentResource()
-        dataset = resource.export(queryset)
-
-        from import_export.formats.base_formats import XLSX
-        xlsx_format = XLSX()
-        export_data = xlsx_format.export_data(dataset)
-
-        response = HttpResponse(
-            export_data,
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename="estudiantes.xlsx"'
-
-        self.message_user(request, f'Se exportaron {queryset.count()} estudiantes.')
-        return response
+        return self.stream_export(request, queryset, 'xlsx', 'estudiantes')
 
     export_selected_students.short_description = "📊 Exportar estudiantes seleccionados"
 
@@ -243,12 +252,13 @@ class StudentAdmin(ImportExportModelAdmin):
         super().save_model(request, obj, form, change)
 
 
-class AssistantProfileAdmin(ImportExportModelAdmin):
+class AssistantProfileAdmin(DryRunCacheAdminMixin, StreamingExportMixin, ImportExportModelAdmin):
     """Admin SOLO para asistentes"""
     resource_class = AssistantResource
     list_display = ['account_number', 'full_name']
     search_fields = ['account_number', 'full_name']
-    actions = ['export_selected_assistants']
+    actions = ['export_selected_assistants', 'export_selected_csv', 'export_selected_jsonl']
+    streaming_export_filename = 'asistentes'
 
     fieldsets = (
         ('Información del Asistente', {
@@ -274,21 +284,7 @@ class AssistantProfileAdmin(ImportExportModelAdmin):
 
     def export_selected_assistants(self, request, queryset):
         """Acción para exportar asistentes seleccionados"""
-        resource = AssistantResource()
-        dataset = resource.export(queryset)
-
-        from import_export.formats.base_formats import XLSX
-        xlsx_format = XLSX()
-        export_data = xlsx_format.export_data(dataset)
-
-        response = HttpResponse(
-            export_data,
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename="asistentes.xlsx"'
-
-        self.message_user(request, f'Se exportaron {queryset.count()} asistentes.')
-        return response
+        return self.stream_export(request, queryset, 'xlsx', 'asistentes')
 
     export_selected_assistants.short_description = "📊 Exportar asistentes seleccionados"
 
@@ -446,7 +442,7 @@ class AsistenteAdmin(admin.ModelAdmin):
 
 
 @admin.register(ExternalUser)
-class ExternalUserAdmin(ImportExportModelAdmin):
+class ExternalUserAdmin(StreamingExportMixin, ImportExportModelAdmin):
     resource_class = ExternalUserResource
     list_display = ['account_number', 'full_name', 'get_status', 'get_approved_by', 'created_at']
     list_filter = ['status', 'created_at', 'approved_by']
@@ -454,7 +450,9 @@ class ExternalUserAdmin(ImportExportModelAdmin):
     ordering = ['-created_at']
     readonly_fields = ['created_at', 'processed_at']
     date_hierarchy = 'created_at'
-    actions = ['export_selected_external_users']
+    actions = ['export_selected_external_users', 'export_selected_csv', 'export_selected_jsonl']
+    streaming_export_filename = 'usuarios_externos'
+    streaming_export_select_related = ('approved_by',)
 
     fieldsets = (
         ('Información Personal', {
@@ -476,21 +474,7 @@ class ExternalUserAdmin(ImportExportModelAdmin):
 
     def export_selected_external_users(self, request, queryset):
         """Acción para exportar usuarios externos seleccionados"""
-        resource = ExternalUserResource()
-        dataset = resource.export(queryset)
-
-        from import_export.formats.base_formats import XLSX
-        xlsx_format = XLSX()
-        export_data = xlsx_format.export_data(dataset)
-
-        response = HttpResponse(
-            export_data,
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename="usuarios_externos.xlsx"'
-
-        self.message_user(request, f'Se exportaron {queryset.count()} usuarios externos.')
-        return response
+        return self.stream_export(request, queryset, 'xlsx', 'usuarios_externos')
 
     export_selected_external_users.short_description = "📊 Exportar usuarios externos seleccionados"
 
@@ -532,6 +516,51 @@ class AuditLogAdmin(admin.ModelAdmin):
                       'ip_address', 'user_agent', 'path', 'method', 'message',
                       'details', 'success', 'status_code']
     date_hierarchy = 'timestamp'
+    change_list_template = 'admin/authentication/auditlog/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path(
+                'bruteforce/',
+                self.admin_site.admin_view(self.bruteforce_view),
+                name='authentication_auditlog_bruteforce'
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def bruteforce_view(self, request):
+        """Estado del detector de fuerza bruta de este proceso; permite levantar bloqueos"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        if request.method == 'POST':
+            if not request.user.is_superuser:
+                raise PermissionDenied
+            dimension = request.POST.get('dimension')
+            key = request.POST.get('key')
+            if dimension in dict(DIMENSIONS) and key:
+                detector.unblock(dimension, key)
+                AuditLog.log(
+                    category='SECURITY',
+                    action='OTHER',
+                    message=f'Bloqueo por fuerza bruta levantado manualmente ({dimension}: {key})',
+                    request=request,
+                    severity='WARNING',
+                    dimension=dimension,
+                    blocked_value=key
+                )
+                self.message_user(request, f'Bloqueo levantado: {key}')
+            return redirect('admin:authentication_auditlog_bruteforce')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Detector de fuerza bruta',
+            'opts': self.model._meta,
+            'enabled': detector.enabled,
+            'dimensions': detector.snapshot(),
+            'can_unblock': request.user.is_superuser,
+        }
+        return TemplateResponse(request, 'admin/authentication/auditlog/bruteforce.html', context)
 
     def has_add_permission(self, request):
         # No permitir crear logs manualmente desde el admin
@@ -0,0 +1,168 @@
+"""
+Caché LRU en proceso para la resolución de números de cuenta.
+
+Durante un evento se escanean una y otra vez los mismos pocos miles de
+números de cuenta. Esta caché guarda el resultado de resolverlos en el
+directorio de asistentes con tamaño acotado y TTL, y se invalida desde las
+señales que mantienen el directorio (ver authentication/signals.py).
+
+Es local a cada proceso: en otros workers los cambios se reflejan, como
+máximo, al expirar el TTL (ATTENDEE_CACHE_TTL).
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+
+class ResolvedAttendee:
+    """Registro compacto de un número de cuenta resuelto"""
+    __slots__ = ('account_number', 'kind', 'profile_id', 'external_user_id', 'full_name', 'status', 'expires_at')
+
+    def __init__(self, account_number, kind, profile_id, external_user_id, full_name, status, expires_at=0.0):
+        self.account_number = account_number
+        self.kind = kind
+        self.profile_id = profile_id
+        self.external_user_id = external_user_id
+        self.full_name = full_name
+        self.status = status
+        self.expires_at = expires_at
+
+    @classmethod
+    def from_entry(cls, entry):
+        return cls(
+            account_number=entry.account_number,
+            kind=entry.kind,
+            profile_id=entry.profile_id,
+            external_user_id=entry.external_user_id,
+            full_name=entry.full_name,
+            status=entry.status
+        )
+
+    @property
+    def is_attendee(self):
+        """Puede registrar asistencia: estudiante o usuario externo aprobado"""
+        return self.kind == 'student' or (self.kind == 'external' and self.status == 'approved')
+
+
+class AttendeeCache:
+    """Caché LRU con TTL, segura para hilos, con contadores para monitoreo"""
+
+    def __init__(self, max_size=5000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, account_number):
+        with self._lock:
+            record = self._data.get(account_number)
+            if record is None:
+                self.misses += 1
+                return None
+            if record.expires_at < time.monotonic():
+                del self._data[account_number]
+                self.misses += 1
+                return None
+            self._data.move_to_end(account_number)
+            self.hits += 1
+            return record
+
+    def set(self, record):
+        record.expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._data[record.account_number] = record
+            self._data.move_to_end(record.account_number)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *account_numbers):
+        with self._lock:
+            for account_number in account_numbers:
+                self._data.pop(account_number, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+attendee_cache = AttendeeCache(
+    max_size=getattr(settings, 'ATTENDEE_CACHE_SIZE', 5000),
+    ttl=getattr(settings, 'ATTENDEE_CACHE_TTL', 300)
+)
+
+
+def _resolve_entries(entries):
+    """
+    Convertir entradas del directorio en registros y guardarlos en la caché.
+
+    En el directorio el perfil gana (así busca el login), pero para registrar
+    asistencia un usuario externo aprobado con el mismo número de cuenta que un
+    asistente es quien cuenta, como en la búsqueda original por tipo.
+    """
+    from .models import ExternalUser
+
+    records = {entry.account_number: ResolvedAttendee.from_entry(entry) for entry in entries}
+    assistants = [account_number for account_number, record in records.items() if record.kind == 'assistant']
+    if assistants:
+        for external in ExternalUser.objects.filter(account_number__in=assistants, status='approved'):
+            records[external.account_number] = ResolvedAttendee(
+                account_number=external.account_number,
+                kind='external',
+                profile_id=None,
+                external_user_id=external.id,
+                full_name=external.full_name,
+                status=external.status
+            )
+    for record in records.values():
+        attendee_cache.set(record)
+    return records
+
+
+def resolve_attendee(account_number):
+    """Resolver un número de cuenta usando la caché y, si falla, el directorio"""
+    from .models import AttendeeDirectory
+
+    record = attendee_cache.get(account_number)
+    if record is None:
+        entry = AttendeeDirectory.resolve(account_number)
+        if entry is None:
+            return None
+        record = _resolve_entries([entry])[entry.account_number]
+    return record
+
+
+def resolve_attendees(account_numbers):
+    """Resolver varios números de cuenta; los que no están en caché se buscan con una sola consulta"""
+    from .models import AttendeeDirectory
+
+    resolved = {}
+    missing = []
+    for account_number in account_numbers:
+        record = attendee_cache.get(account_number)
+        if record is None:
+            missing.append(account_number)
+        else:
+            resolved[account_number] = record
+
+    if missing:
+        resolved.update(_resolve_entries(AttendeeDirectory.objects.filter(account_number__in=missing)))
+
+    return resolved
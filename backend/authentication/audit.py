@@ -1,12 +1,31 @@
 """
 Sistema de auditoría para registrar eventos de seguridad
 """
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
+from datetime import timedelta
 import json
 
 
+def get_client_ip(request):
+    """
+    IP del cliente. X-Forwarded-For lo escribe el cliente, así que solo se confía
+    en las últimas TRUSTED_PROXY_HOPS entradas (las que agregan los proxies propios);
+    sin proxies configurados se usa REMOTE_ADDR. También la usa django-ratelimit
+    (RATELIMIT_IP_META_KEY), para que el rate limit y el detector de fuerza bruta
+    vean la misma IP.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR') or ''
+    hops = settings.TRUSTED_PROXY_HOPS
+    if not hops:
+        return remote_addr
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    chain = [ip.strip() for ip in forwarded.split(',') if ip.strip()] + [remote_addr]
+    return chain[max(len(chain) - 1 - hops, 0)]
+
+
 class AuditLog(models.Model):
     """
     Modelo para registrar eventos de auditoría del sistema
@@ -37,6 +56,7 @@ class AuditLog(models.Model):
         ('TOKEN_REFRESH', 'Token refrescado'),
         ('ACCESS_DENIED', 'Acceso denegado'),
         ('RATE_LIMITED', 'Rate limit excedido'),
+        ('BRUTE_FORCE_BLOCKED', 'Bloqueo por fuerza bruta'),
         ('ATTENDANCE_CREATE', 'Asistencia registrada'),
         ('ATTENDANCE_UPDATE', 'Asistencia actualizada'),
         ('ATTENDANCE_DELETE', 'Asistencia eliminada'),
@@ -112,6 +132,18 @@ class AuditLog(models.Model):
             status_code: Código HTTP de respuesta
             **details: Datos adicionales a guardar en JSON
         """
+        # Con escritura diferida se guarda en lote desde otro hilo
+        from .audit_writer import audit_writer
+
+        return audit_writer.submit(cls.build(
+            category, action, message, request=request, user=user,
+            severity=severity, success=success, status_code=status_code, **details
+        ))
+
+    @classmethod
+    def build(cls, category, action, message, request=None, user=None,
+              severity='INFO', success=True, status_code=None, **details):
+        """Construir el registro sin guardarlo (mismos argumentos que log())"""
         # Extraer información del request
         ip_address = None
         user_agent = ''
@@ -119,13 +151,7 @@ class AuditLog(models.Model):
         method = ''
 
         if request:
-            # Obtener IP real (considerando proxies)
-            x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-            if x_forwarded_for:
-                ip_address = x_forwarded_for.split(',')[0].strip()
-            else:
-                ip_address = request.META.get('REMOTE_ADDR')
-
+            ip_address = cls.get_client_ip(request)
             user_agent = request.META.get('HTTP_USER_AGENT', '')[:500]  # Limitar tamaño
             path = request.path
             method = request.method
@@ -140,8 +166,7 @@ class AuditLog(models.Model):
         # Sanitizar detalles (no guardar datos sensibles)
         sanitized_details = cls._sanitize_details(details)
 
-        # Crear el log
-        return cls.objects.create(
+        return cls(
             category=category,
             severity=severity,
             action=action,
@@ -157,6 +182,11 @@ class AuditLog(models.Model):
             status_code=status_code,
         )
 
+    @staticmethod
+    def get_client_ip(request):
+        """Obtener IP real (considerando solo los proxies de confianza)"""
+        return get_client_ip(request)
+
     @staticmethod
     def _sanitize_details(details):
         """
@@ -219,4 +249,88 @@ class AuditLog(models.Model):
             category='SECURITY',
             severity__in=[severity, 'ERROR', 'CRITICAL'],
             timestamp__gte=cutoff
-        )
\ No newline at end of file
+        )
+
+    @classmethod
+    def failed_logins_by_ip(cls, days=7):
+        """Logins fallidos por IP en los últimos N días, leídos de los agregados por hora"""
+        from .audit_rollups import counts_by_ip
+
+        return counts_by_ip('LOGIN_FAILED', timezone.now() - timedelta(days=days), success=False)
+
+
+class AuditHourlyRollup(models.Model):
+    """Número de registros de auditoría por hora, categoría, acción, severidad y resultado"""
+
+    hour = models.DateTimeField(db_index=True)
+    category = models.CharField(max_length=20, choices=AuditLog.CATEGORY_CHOICES)
+    action = models.CharField(max_length=50, choices=AuditLog.ACTION_CHOICES)
+    severity = models.CharField(max_length=20, choices=AuditLog.SEVERITY_CHOICES)
+    success = models.BooleanField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hour', 'category', 'action', 'severity', 'success'],
+                name='unique_audit_hourly_rollup'
+            ),
+        ]
+        verbose_name = 'Resumen de auditoría por hora'
+        verbose_name_plural = 'Resúmenes de auditoría por hora'
+
+
+class AuditIPHourlyRollup(models.Model):
+    """Número de registros de auditoría por hora, IP, acción y resultado"""
+
+    hour = models.DateTimeField()
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    action = models.CharField(max_length=50, choices=AuditLog.ACTION_CHOICES)
+    success = models.BooleanField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hour', 'ip_address', 'action', 'success'],
+                name='unique_audit_ip_hourly_rollup'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['action', 'hour']),
+        ]
+        verbose_name = 'Resumen de auditoría por IP y hora'
+        verbose_name_plural = 'Resúmenes de auditoría por IP y hora'
+
+
+class AuditUserHourlyRollup(models.Model):
+    """Número de registros de auditoría por hora, usuario, acción y resultado"""
+
+    hour = models.DateTimeField()
+    username = models.CharField(max_length=150, blank=True)
+    action = models.CharField(max_length=50, choices=AuditLog.ACTION_CHOICES)
+    success = models.BooleanField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hour', 'username', 'action', 'success'],
+                name='unique_audit_user_hourly_rollup'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['action', 'hour']),
+        ]
+        verbose_name = 'Resumen de auditoría por usuario y hora'
+        verbose_name_plural = 'Resúmenes de auditoría por usuario y hora'
+
+
+class AuditRollupState(models.Model):
+    """Marca de agua de los agregados: último AuditLog ya sumado (fila única)"""
+
+    last_log_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Estado de los resúmenes de auditoría'
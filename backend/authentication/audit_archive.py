@@ -0,0 +1,152 @@
+"""
+Archivo y depuración de registros de auditoría vencidos.
+
+La retención se configura en AUDIT_RETENTION_DAYS por categoría y severidad:
+las claves son tuplas (categoría, severidad) donde None funciona como comodín, y
+gana la regla más específica: (categoría, severidad), luego (categoría, None),
+luego (None, severidad) y por último (None, None).
+
+El archivador recorre los registros vencidos en bloques por llave primaria,
+los escribe como JSON por línea en archivos gzip por mes
+(auditlog-AAAA-MM.<ejecución>.jsonl.gz), verifica que cada archivo tenga tantas
+líneas como filas se leyeron y solo entonces borra los bloques archivados, cada
+uno en su propia transacción corta. Antes de archivar se ponen al día los
+agregados por hora (audit_rollups.py) y solo se archivan registros ya sumados.
+"""
+import gzip
+import json
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .audit import AuditLog
+from .audit_rollups import catch_up, get_high_water_mark
+
+
+def retention_days(category, severity):
+    """Días de retención de una categoría y severidad según AUDIT_RETENTION_DAYS"""
+    rules = settings.AUDIT_RETENTION_DAYS
+    for key in ((category, severity), (category, None), (None, severity), (None, None)):
+        if key in rules:
+            return rules[key]
+    return None
+
+
+def expired_filter(now=None):
+    """Q de los registros cuya retención ya venció; None si ninguna regla aplica"""
+    now = now or timezone.now()
+    condition = None
+    for category, _ in AuditLog.CATEGORY_CHOICES:
+        for severity, _ in AuditLog.SEVERITY_CHOICES:
+            days = retention_days(category, severity)
+            if days is None:
+                continue
+            rule = Q(category=category, severity=severity, timestamp__lt=now - timedelta(days=days))
+            condition = rule if condition is None else condition | rule
+    return condition
+
+
+class ArchiveError(Exception):
+    """Un archivo o un bloque borrado no coincide con las filas leídas"""
+
+
+class AuditArchiveResult:
+    """Resumen de una ejecución"""
+
+    def __init__(self):
+        self.months = {}  # 'AAAA-MM' -> filas archivadas
+        self.files = []
+        self.deleted = 0
+        self.elapsed = 0.0
+
+    @property
+    def archived(self):
+        return sum(self.months.values())
+
+
+class AuditArchiver:
+    """Archiva en gzip por mes y borra por bloques los registros de auditoría vencidos"""
+
+    def __init__(self, output_dir=None, batch_size=5000):
+        self.output_dir = Path(output_dir or settings.AUDIT_ARCHIVE_DIR)
+        self.batch_size = batch_size
+
+    def expired(self, now=None, rolled_up_only=True):
+        condition = expired_filter(now)
+        if condition is None:
+            return AuditLog.objects.none()
+        queryset = AuditLog.objects.filter(condition)
+        if rolled_up_only:
+            # Solo registros ya sumados a los agregados por hora
+            queryset = queryset.filter(pk__lte=get_high_water_mark())
+        return queryset
+
+    def _chunks(self, queryset):
+        """Bloques de filas (como diccionarios) en orden de llave primaria"""
+        last_pk = 0
+        while True:
+            rows = list(queryset.filter(pk__gt=last_pk).order_by('pk').values()[:self.batch_size])
+            if not rows:
+                return
+            last_pk = rows[-1]['id']
+            yield rows
+
+    def run(self, dry_run=False, now=None):
+        started = time.monotonic()
+        now = now or timezone.now()
+        if not dry_run:
+            catch_up(self.batch_size, now=now)
+        # La simulación no pone al día los agregados: cuenta lo que archivaría una ejecución real
+        queryset = self.expired(now, rolled_up_only=not dry_run)
+        result = AuditArchiveResult()
+
+        if dry_run:
+            for row in queryset.values('timestamp').iterator(chunk_size=self.batch_size):
+                month = timezone.localtime(row['timestamp']).strftime('%Y-%m')
+                result.months[month] = result.months.get(month, 0) + 1
+            result.elapsed = time.monotonic() - started
+            return result
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        run_id = now.strftime('%Y%m%dT%H%M%S')
+        files = {}
+        ranges = []  # (primer pk, último pk, filas) de cada bloque archivado
+        try:
+            for rows in self._chunks(queryset):
+                for row in rows:
+                    month = timezone.localtime(row['timestamp']).strftime('%Y-%m')
+                    if month not in files:
+                        path = self.output_dir / f'auditlog-{month}.{run_id}.jsonl.gz'
+                        files[month] = (path, gzip.open(f'{path}.tmp', 'wt', encoding='utf-8'))
+                    files[month][1].write(json.dumps(row, ensure_ascii=False, default=str) + '\n')
+                    result.months[month] = result.months.get(month, 0) + 1
+                ranges.append((rows[0]['id'], rows[-1]['id'], len(rows)))
+        finally:
+            for _, handle in files.values():
+                handle.close()
+
+        # Verificar cada archivo antes de borrar cualquier fila
+        for month, (path, _) in files.items():
+            with gzip.open(f'{path}.tmp', 'rt', encoding='utf-8') as handle:
+                lines = sum(1 for _ in handle)
+            if lines != result.months[month]:
+                raise ArchiveError(
+                    f'{path.name}: {lines} líneas escritas, {result.months[month]} filas leídas'
+                )
+            os.replace(f'{path}.tmp', path)
+            result.files.append(path)
+
+        # Borrar por rangos de llave primaria, cada bloque en su propia transacción
+        for first_pk, last_pk, count in ranges:
+            deleted, _ = queryset.filter(pk__range=(first_pk, last_pk)).delete()
+            if deleted != count:
+                raise ArchiveError(
+                    f'Bloque {first_pk}-{last_pk}: se archivaron {count} filas pero se borraron {deleted}'
+                )
+            result.deleted += deleted
+
+        result.elapsed = time.monotonic() - started
+        return result
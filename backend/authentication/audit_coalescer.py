@@ -0,0 +1,129 @@
+"""
+Agrupación de eventos de seguridad repetidos (401, 403, 429) antes de auditarlos.
+
+Cuando una IP golpea repetidamente un endpoint, AuditMiddleware generaría una
+fila por solicitud. El agrupador acumula las repeticiones con la misma clave
+(ip, acción, ruta, usuario, código HTTP) durante AUDIT_COALESCE_WINDOW segundos
+y al cerrar la ventana escribe una sola fila, con la fecha de la primera
+solicitud y en details el número de solicitudes y la primera y última hora.
+
+Las ventanas vencidas se escriben al llegar la siguiente solicitud al servidor
+y al terminar el proceso. El número de claves abiertas está acotado por
+AUDIT_COALESCE_MAX_KEYS: si se llena (ataque desde muchas IPs), la ventana más
+antigua se escribe antes de tiempo.
+"""
+import atexit
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.utils import timezone
+from .audit_writer import audit_writer
+
+
+class _Bucket:
+    __slots__ = ('log', 'count', 'first_seen', 'last_seen', 'closes_at')
+
+    def __init__(self, log, now, window):
+        self.log = log
+        self.count = 1
+        self.first_seen = log.timestamp
+        self.last_seen = log.timestamp
+        self.closes_at = now + window
+
+
+class SecurityEventCoalescer:
+    """Ventanas abiertas de eventos de seguridad repetidos, en orden de apertura"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+        # Cierre de la ventana más antigua; permite revisar sin tomar el candado
+        self._next_close = None
+
+    @property
+    def window(self):
+        return settings.AUDIT_COALESCE_WINDOW
+
+    def add(self, category, action, message, request=None, user=None, **kwargs):
+        """Registrar un evento de seguridad; se escribe agrupado al cerrar su ventana"""
+        from .audit import AuditLog
+
+        log = AuditLog.build(category, action, message, request=request, user=user, **kwargs)
+        if not self.window:
+            self._write(log, 1, None, None)
+            return
+
+        key = (log.ip_address, log.action, log.path, log.user_id, log.status_code)
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None and bucket.closes_at > now:
+                bucket.count += 1
+                bucket.last_seen = timezone.now()
+                return
+
+            if bucket is not None:
+                evicted.append(self._buckets.pop(key))
+            while len(self._buckets) >= settings.AUDIT_COALESCE_MAX_KEYS:
+                evicted.append(self._buckets.popitem(last=False)[1])
+            self._buckets[key] = _Bucket(log, now, self.window)
+            self._update_next_close()
+
+        for bucket in evicted:
+            self._write_bucket(bucket)
+
+    def sweep(self):
+        """Escribir las ventanas vencidas"""
+        next_close = self._next_close
+        if next_close is None or next_close > time.monotonic():
+            return
+
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            while self._buckets:
+                key, bucket = next(iter(self._buckets.items()))
+                if bucket.closes_at > now:
+                    break
+                expired.append(self._buckets.pop(key))
+            self._update_next_close()
+
+        for bucket in expired:
+            self._write_bucket(bucket)
+
+    def flush(self):
+        """Escribir todas las ventanas abiertas (al terminar el proceso)"""
+        with self._lock:
+            pending = list(self._buckets.values())
+            self._buckets.clear()
+            self._next_close = None
+
+        for bucket in pending:
+            self._write_bucket(bucket)
+
+    def _update_next_close(self):
+        # Todas las ventanas duran lo mismo: la primera en abrirse es la primera en cerrar
+        self._next_close = next(iter(self._buckets.values())).closes_at if self._buckets else None
+
+    def _write_bucket(self, bucket):
+        self._write(bucket.log, bucket.count, bucket.first_seen, bucket.last_seen)
+
+    @staticmethod
+    def _write(log, count, first_seen, last_seen):
+        if count > 1:
+            log.timestamp = first_seen
+            log.message = f'{log.message} ({count} solicitudes)'
+            log.details = {
+                **log.details,
+                'count': count,
+                'first_seen': first_seen.isoformat(),
+                'last_seen': last_seen.isoformat(),
+            }
+        audit_writer.submit(log)
+
+
+security_events = SecurityEventCoalescer()
+# Registrado después del escritor diferido, así atexit lo ejecuta antes que el flush de este
+atexit.register(security_events.flush)
@@ -0,0 +1,158 @@
+"""
+Agregados por hora de los registros de auditoría para tableros de seguridad.
+
+Tres tablas de conteos por hora: por (categoría, acción, severidad, resultado),
+por IP y por usuario. Se mantienen de forma incremental desde una marca de agua
+(AuditRollupState.last_log_id): catch_up() suma los registros con id mayor a la
+marca y la avanza, en la misma transacción. Lo llama el escritor diferido de
+auditoría después de guardar sus lotes (cada AUDIT_ROLLUP_INTERVAL segundos) y
+el comando rollup_audit_logs.
+
+Solo se suman registros con más de AUDIT_ROLLUP_LAG segundos de antigüedad: una
+fila insertada dentro de una transacción larga puede confirmarse después de
+otra con id mayor, y no debe quedar detrás de la marca. Las consultas de este
+módulo completan los agregados con los registros aún no sumados, así que sus
+resultados están al día.
+
+Los registros agrupados por el middleware (details.count) cuentan como tantas
+solicitudes como agrupan. Las consultas redondean `since` hacia abajo a la hora.
+"""
+from collections import Counter
+from datetime import timedelta
+from itertools import takewhile
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .audit import (
+    AuditLog, AuditHourlyRollup, AuditIPHourlyRollup, AuditUserHourlyRollup, AuditRollupState
+)
+
+ROLLUP_KEYS = (
+    (AuditHourlyRollup, ('hour', 'category', 'action', 'severity', 'success')),
+    (AuditIPHourlyRollup, ('hour', 'ip_address', 'action', 'success')),
+    (AuditUserHourlyRollup, ('hour', 'username', 'action', 'success')),
+)
+
+
+def _hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def get_high_water_mark():
+    return AuditRollupState.objects.filter(pk=1).values_list('last_log_id', flat=True).first() or 0
+
+
+def _merge(model, fields, counts):
+    """Sumar los conteos a las filas existentes y crear las que falten"""
+    existing = {
+        tuple(getattr(rollup, field) for field in fields): rollup
+        for rollup in model.objects.filter(hour__in={key[0] for key in counts})
+    }
+    to_create = []
+    for key, count in counts.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            to_create.append(model(count=count, **dict(zip(fields, key))))
+        else:
+            rollup.count += count
+    model.objects.bulk_update(
+        [rollup for key, rollup in existing.items() if key in counts], ['count'], batch_size=1000
+    )
+    model.objects.bulk_create(to_create, batch_size=1000)
+
+
+def _roll_batch(batch_size, cutoff):
+    """Sumar el siguiente bloque de registros; devuelve cuántos se sumaron"""
+    with transaction.atomic():
+        state, _ = AuditRollupState.objects.select_for_update().get_or_create(pk=1)
+        rows = list(
+            AuditLog.objects.filter(pk__gt=state.last_log_id).order_by('pk').values_list(
+                'id', 'timestamp', 'category', 'action', 'severity', 'success',
+                'ip_address', 'username', 'details__count'
+            )[:batch_size]
+        )
+        # Solo el prefijo anterior al margen: la marca no puede saltar filas recientes
+        ready = list(takewhile(lambda row: row[1] <= cutoff, rows))
+        if not ready:
+            return 0
+
+        counts = [Counter(), Counter(), Counter()]
+        for _, timestamp, category, action, severity, success, ip_address, username, grouped in ready:
+            hour = _hour(timestamp)
+            count = grouped if isinstance(grouped, int) and grouped > 0 else 1
+            counts[0][(hour, category, action, severity, success)] += count
+            counts[1][(hour, ip_address, action, success)] += count
+            counts[2][(hour, username, action, success)] += count
+
+        for (model, fields), model_counts in zip(ROLLUP_KEYS, counts):
+            _merge(model, fields, model_counts)
+
+        state.last_log_id = ready[-1][0]
+        state.save(update_fields=['last_log_id', 'updated_at'])
+        return len(ready)
+
+
+def catch_up(batch_size=5000, now=None):
+    """Sumar a los agregados todos los registros pendientes; devuelve cuántos se sumaron"""
+    cutoff = (now or timezone.now()) - timedelta(seconds=settings.AUDIT_ROLLUP_LAG)
+    total = 0
+    while True:
+        rolled = _roll_batch(batch_size, cutoff)
+        total += rolled
+        if rolled < batch_size:
+            return total
+
+
+def rebuild(batch_size=5000):
+    """Borrar los agregados y recalcularlos desde los registros existentes"""
+    with transaction.atomic():
+        for model, _ in ROLLUP_KEYS:
+            model.objects.all().delete()
+        AuditRollupState.objects.update_or_create(pk=1, defaults={'last_log_id': 0})
+    return catch_up(batch_size)
+
+
+def _counts(model, field, since, filters, log_filters):
+    """Conteos por `field` desde `since`: agregados más registros aún no sumados"""
+    totals = Counter(dict(
+        model.objects.filter(hour__gte=_hour(since), **filters)
+        .values(field).annotate(total=Sum('count')).values_list(field, 'total')
+    ))
+    pending = AuditLog.objects.filter(
+        pk__gt=get_high_water_mark(), timestamp__gte=_hour(since), **log_filters
+    )
+    for value, grouped in pending.values_list(field, 'details__count'):
+        totals[value] += grouped if isinstance(grouped, int) and grouped > 0 else 1
+    return totals
+
+
+def counts_by_ip(action, since, success=None, limit=None):
+    """[(ip, total)] de una acción desde `since`, de mayor a menor"""
+    filters = {'action': action}
+    if success is not None:
+        filters['success'] = success
+    return _counts(AuditIPHourlyRollup, 'ip_address', since, filters, filters).most_common(limit)
+
+
+def counts_by_user(action, since, success=None, limit=None):
+    """[(usuario, total)] de una acción desde `since`, de mayor a menor"""
+    filters = {'action': action}
+    if success is not None:
+        filters['success'] = success
+    return _counts(AuditUserHourlyRollup, 'username', since, filters, filters).most_common(limit)
+
+
+def counts_by_hour(since, **filters):
+    """
+    {hora: total} desde `since`, filtrando por category, action, severity o success
+    (por ejemplo, eventos de seguridad por hora para una gráfica)
+    """
+    totals = Counter(dict(
+        AuditHourlyRollup.objects.filter(hour__gte=_hour(since), **filters)
+        .values('hour').annotate(total=Sum('count')).values_list('hour', 'total')
+    ))
+    pending = AuditLog.objects.filter(pk__gt=get_high_water_mark(), timestamp__gte=_hour(since), **filters)
+    for timestamp, grouped in pending.values_list('timestamp', 'details__count'):
+        totals[_hour(timestamp)] += grouped if isinstance(grouped, int) and grouped > 0 else 1
+    return dict(sorted(totals.items()))
@@ -0,0 +1,138 @@
+"""
+Escritura diferida (write-behind) de registros de auditoría.
+
+Con AUDIT_WRITE_BEHIND activado, AuditLog.log() no inserta la fila dentro de la
+solicitud: la deja en una cola acotada en memoria y un hilo en segundo plano la
+guarda con bulk_create cada AUDIT_BATCH_SIZE registros o cada
+AUDIT_FLUSH_INTERVAL_MS milisegundos, lo que ocurra primero. Al terminar el
+proceso se escriben los registros pendientes.
+
+Si la cola está llena (la base de datos no alcanza a escribir) el registro se
+guarda de forma síncrona, como sin escritura diferida: nunca se descarta.
+
+El mismo hilo actualiza los agregados por hora cada AUDIT_ROLLUP_INTERVAL
+segundos (ver audit_rollups.py).
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger('authentication.audit')
+
+
+class AuditLogWriter:
+    """Cola acotada de AuditLog sin guardar y el hilo que la escribe por lotes"""
+
+    def __init__(self):
+        self._queue = None
+        self._pending = []
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    @property
+    def enabled(self):
+        return settings.AUDIT_WRITE_BEHIND
+
+    def submit(self, log):
+        """Encolar un AuditLog sin guardar; se guarda de inmediato si la cola está llena"""
+        if not self.enabled:
+            log.save()
+            return log
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(log)
+        except queue.Full:
+            log.save()
+        return log
+
+    def flush(self):
+        """Escribir de inmediato todo lo pendiente (al salir del proceso o antes de leer)"""
+        if self._queue is None:
+            return 0
+        with self._write_lock:
+            self._drain()
+            return self._write_pending()
+
+    def _ensure_started(self):
+        # Con workers creados por fork el hilo del proceso padre no existe en el hijo
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=settings.AUDIT_QUEUE_SIZE)
+            self._pending = []
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+            self._thread.start()
+
+    def _drain(self):
+        while True:
+            try:
+                self._pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                return
+
+    def _run(self):
+        batch_size = settings.AUDIT_BATCH_SIZE
+        interval = settings.AUDIT_FLUSH_INTERVAL_MS / 1000
+        deadline = time.monotonic() + interval
+        next_rollup = time.monotonic() + settings.AUDIT_ROLLUP_INTERVAL
+        while True:
+            try:
+                log = self._queue.get(timeout=max(deadline - time.monotonic(), 0.001))
+            except queue.Empty:
+                log = None
+
+            with self._write_lock:
+                if log is not None:
+                    self._pending.append(log)
+                if len(self._pending) >= batch_size or time.monotonic() >= deadline:
+                    self._write_pending()
+                    deadline = time.monotonic() + interval
+
+            if time.monotonic() >= next_rollup:
+                self._update_rollups()
+                next_rollup = time.monotonic() + settings.AUDIT_ROLLUP_INTERVAL
+
+    def _update_rollups(self):
+        """Sumar los registros nuevos a los agregados por hora (ver audit_rollups.py)"""
+        from .audit_rollups import catch_up
+
+        try:
+            catch_up()
+        except Exception:
+            logger.exception('Error al actualizar los resúmenes de auditoría')
+
+    def _write_pending(self):
+        """Guardar los registros acumulados; se llama con _write_lock tomado"""
+        if not self._pending:
+            return 0
+
+        from .audit import AuditLog
+
+        batch, self._pending = self._pending, []
+        close_old_connections()
+        try:
+            AuditLog.objects.bulk_create(batch, batch_size=settings.AUDIT_BATCH_SIZE)
+        except Exception:
+            # Un registro inválido no debe perder el resto del lote
+            logger.exception('Error al guardar %d registros de auditoría en lote', len(batch))
+            for log in batch:
+                try:
+                    log.save()
+                except Exception:
+                    logger.exception('Registro de auditoría perdido: %s', log.message)
+        return len(batch)
+
+
+audit_writer = AuditLogWriter()
+atexit.register(audit_writer.flush)
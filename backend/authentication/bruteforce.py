@@ -0,0 +1,192 @@
+"""
+Detector en memoria de fuerza bruta sobre el login.
+
+Cada login fallido se anota en ventanas deslizantes por IP, por número de cuenta
+y por subred (/24 en IPv4, /64 en IPv6), lo que detecta también ataques lentos
+o distribuidos que el rate limit por IP (5/m) deja pasar. Cada clave guarda un
+búfer circular con las horas de sus últimos `threshold` fallos: si el más
+antiguo está dentro de la ventana, la clave se bloquea `block` segundos.
+
+Los bloqueos por IP y subred se revisan antes de validar la contraseña. El de
+la cuenta solo se aplica a intentos fallidos: una contraseña correcta entra y
+levanta el bloqueo, para que nadie pueda dejar fuera a un usuario con solo
+conocer su número de cuenta. Sin número de cuenta no se usa esa dimensión.
+
+Todo vive en memoria del proceso (sin consultas en el login) y está acotado:
+cada dimensión conserva como máximo BRUTEFORCE_MAX_KEYS claves, descartando las
+usadas hace más tiempo. Las reglas se configuran en BRUTEFORCE_RULES.
+"""
+import ipaddress
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+
+DIMENSIONS = (
+    ('ip', 'IP'),
+    ('account', 'Número de cuenta'),
+    ('subnet', 'Subred'),
+)
+
+
+def subnet_of(ip):
+    """Subred /24 (IPv4) o /64 (IPv6) de una IP; None si no es válida"""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    prefix = 24 if address.version == 4 else 64
+    return str(ipaddress.ip_network(f'{address}/{prefix}', strict=False))
+
+
+class SlidingWindow:
+    """Búferes circulares de fallos por clave, con bloqueos y tamaño acotado (LRU)"""
+
+    def __init__(self, threshold, window, block, max_keys):
+        self.threshold = threshold
+        self.window = window
+        self.block = block
+        self.max_keys = max_keys
+        self.failures = OrderedDict()  # clave -> deque(maxlen=threshold) de time.monotonic()
+        self.blocked = OrderedDict()   # clave -> (fin en time.monotonic(), fin como fecha)
+
+    def blocked_for(self, key, now):
+        """Segundos de bloqueo restantes de la clave (0 si no está bloqueada)"""
+        until = self.blocked.get(key)
+        if until is None:
+            return 0
+        if until[0] <= now:
+            del self.blocked[key]
+            return 0
+        return until[0] - now
+
+    def add_failure(self, key, now):
+        """Anotar un fallo; devuelve True si con él la clave queda bloqueada"""
+        failures = self.failures.get(key)
+        if failures is None:
+            failures = self.failures[key] = deque(maxlen=self.threshold)
+            if len(self.failures) > self.max_keys:
+                self.failures.popitem(last=False)
+        else:
+            self.failures.move_to_end(key)
+        failures.append(now)
+
+        if len(failures) < self.threshold or now - failures[0] > self.window:
+            return False
+        failures.clear()
+        self.blocked[key] = (now + self.block, timezone.now() + timedelta(seconds=self.block))
+        self.blocked.move_to_end(key)
+        if len(self.blocked) > self.max_keys:
+            self.blocked.popitem(last=False)
+        return True
+
+    def recent_failures(self, key, now):
+        failures = self.failures.get(key, ())
+        return sum(1 for moment in failures if now - moment <= self.window)
+
+    def reset(self, key):
+        self.failures.pop(key, None)
+        self.blocked.pop(key, None)
+
+
+class BruteForceDetector:
+    """Ventanas por IP, cuenta y subred compartidas por los hilos del proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._windows = None
+
+    @property
+    def enabled(self):
+        return settings.BRUTEFORCE_ENABLED
+
+    @property
+    def windows(self):
+        if self._windows is None:
+            self._windows = {
+                dimension: SlidingWindow(max_keys=settings.BRUTEFORCE_MAX_KEYS, **settings.BRUTEFORCE_RULES[dimension])
+                for dimension, _ in DIMENSIONS
+            }
+        return self._windows
+
+    @staticmethod
+    def _keys(ip, account_number):
+        keys = {'ip': ip, 'account': str(account_number or '')[:20] or None, 'subnet': subnet_of(ip) if ip else None}
+        return {dimension: key for dimension, key in keys.items() if key}
+
+    def check(self, ip, account_number=None):
+        """(dimensión, clave, segundos restantes) del bloqueo más largo que aplica, o None"""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        longest = None
+        with self._lock:
+            for dimension, key in self._keys(ip, account_number).items():
+                remaining = self.windows[dimension].blocked_for(key, now)
+                if remaining and (longest is None or remaining > longest[2]):
+                    longest = (dimension, key, remaining)
+        return longest
+
+    def record_failure(self, ip, account_number):
+        """Anotar un login fallido; devuelve [(dimensión, clave)] bloqueadas con este fallo"""
+        if not self.enabled:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (dimension, key)
+                for dimension, key in self._keys(ip, account_number).items()
+                if self.windows[dimension].add_failure(key, now)
+            ]
+
+    def record_success(self, account_number):
+        """Un login correcto reinicia los fallos y el bloqueo de la cuenta (no los de la IP o la subred)"""
+        key = self._keys(None, account_number).get('account')
+        if not self.enabled or key is None:
+            return
+        with self._lock:
+            self.windows['account'].reset(key)
+
+    def unblock(self, dimension, key):
+        with self._lock:
+            self.windows[dimension].reset(key)
+
+    def snapshot(self, limit=20):
+        """Estado actual por dimensión para el admin: bloqueos activos y claves con más fallos"""
+        now = time.monotonic()
+        state = []
+        with self._lock:
+            for dimension, label in DIMENSIONS:
+                window = self.windows[dimension]
+                blocked = []
+                for key in list(window.blocked):
+                    remaining = window.blocked_for(key, now)
+                    if remaining:
+                        blocked.append({
+                            'key': key,
+                            'remaining': int(remaining),
+                            'until': window.blocked[key][1],
+                        })
+                watched = sorted(
+                    (
+                        {'key': key, 'failures': window.recent_failures(key, now)}
+                        for key in window.failures
+                    ),
+                    key=lambda entry: -entry['failures']
+                )
+                state.append({
+                    'dimension': dimension,
+                    'label': label,
+                    'threshold': window.threshold,
+                    'window': window.window,
+                    'block': window.block,
+                    'tracked': len(window.failures),
+                    'blocked': blocked,
+                    'watched': [entry for entry in watched if entry['failures']][:limit],
+                })
+        return state
+
+
+detector = BruteForceDetector()
@@ -0,0 +1,55 @@
+"""
+Archivar y depurar registros de auditoría vencidos según AUDIT_RETENTION_DAYS.
+
+Los registros vencidos se guardan en AUDIT_ARCHIVE_DIR como JSON por línea
+comprimido, un archivo por mes, y se borran por bloques después de verificar
+los archivos.
+
+Uso:
+    python manage.py archive_audit_logs
+    python manage.py archive_audit_logs --dry-run
+    python manage.py archive_audit_logs --output-dir /respaldos/auditoria --batch-size 10000
+"""
+from django.core.management.base import BaseCommand, CommandError
+from authentication.audit_archive import ArchiveError, AuditArchiver
+
+
+class Command(BaseCommand):
+    help = 'Archiva en gzip por mes y borra los registros de auditoría vencidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir',
+            help='Directorio de los archivos (por defecto: AUDIT_ARCHIVE_DIR)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Filas por bloque de lectura y de borrado (por defecto: 5000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo contar los registros vencidos por mes, sin archivar ni borrar'
+        )
+
+    def handle(self, *args, **options):
+        archiver = AuditArchiver(output_dir=options['output_dir'], batch_size=options['batch_size'])
+        try:
+            result = archiver.run(dry_run=options['dry_run'])
+        except (ArchiveError, OSError) as e:
+            raise CommandError(f'Archivo interrumpido: {e}')
+
+        for month, count in sorted(result.months.items()):
+            self.stdout.write(f'{month}: {count} registros')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{result.archived} registros vencidos (sin cambios)'))
+            return
+
+        for path in result.files:
+            self.stdout.write(f'Archivo: {path}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.archived} registros archivados y {result.deleted} borrados en {result.elapsed:.2f}s'
+        ))
@@ -0,0 +1,67 @@
+"""
+Importar un padrón de estudiantes o asistentes por lotes.
+
+El archivo (XLSX o CSV) debe tener las columnas account_number y full_name.
+Todo el archivo se valida antes de escribir; si hay errores no se importa nada.
+
+Uso:
+    python manage.py import_roster estudiantes.xlsx
+    python manage.py import_roster asistentes.csv --type assistant
+    python manage.py import_roster estudiantes.xlsx --dry-run
+"""
+from django.core.management.base import BaseCommand, CommandError
+from authentication.importers import RosterImporter
+
+MAX_REPORTED_ERRORS = 50
+
+
+class Command(BaseCommand):
+    help = 'Importa un padrón de estudiantes o asistentes con inserciones por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo XLSX o CSV con account_number y full_name')
+        parser.add_argument(
+            '--type',
+            choices=['student', 'assistant'],
+            default='student',
+            help='Tipo de usuario del padrón (por defecto: student)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tamaño de lote para las inserciones (por defecto: 1000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo validar el archivo, sin escribir en la base de datos'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            rows = RosterImporter.load(options['path'])
+        except OSError as e:
+            raise CommandError(f'No se pudo leer el archivo: {e}')
+
+        importer = RosterImporter(options['type'], batch_size=options['batch_size'])
+        result = importer.run(rows, dry_run=options['dry_run'])
+
+        if result.errors:
+            for row_number, message in result.errors[:MAX_REPORTED_ERRORS]:
+                self.stderr.write(f'Fila {row_number}: {message}')
+            if len(result.errors) > MAX_REPORTED_ERRORS:
+                self.stderr.write(f'... y {len(result.errors) - MAX_REPORTED_ERRORS} errores más')
+            raise CommandError(f'{len(result.errors)} errores de validación; no se importó ningún registro')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Archivo válido: {result.total} filas ({result.elapsed:.2f}s)'
+            ))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Importación completada: {result.created} creados, {result.updated} actualizados, '
+            f'{result.unchanged} sin cambios en {result.elapsed:.2f}s '
+            f'({result.rows_per_second:.0f} filas/s)'
+        ))
@@ -0,0 +1,18 @@
+"""
+Reconstruir el directorio de asistentes desde perfiles y usuarios externos.
+
+Uso:
+    python manage.py rebuild_attendee_directory
+"""
+from django.core.management.base import BaseCommand
+from authentication.models import AttendeeDirectory
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el directorio de asistentes (números de cuenta unificados)'
+
+    def handle(self, *args, **options):
+        AttendeeDirectory.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Directorio reconstruido: {AttendeeDirectory.objects.count()} números de cuenta'
+        ))
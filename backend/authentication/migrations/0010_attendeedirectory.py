@@ -0,0 +1,60 @@
+# Generated by Django 5.2.6 on 2026-10-17 10:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_attendee_directory(apps, schema_editor):
+    """Llenar el directorio con los perfiles y usuarios externos existentes"""
+    UserProfile = apps.get_model('authentication', 'UserProfile')
+    ExternalUser = apps.get_model('authentication', 'ExternalUser')
+    AttendeeDirectory = apps.get_model('authentication', 'AttendeeDirectory')
+
+    entries = {}
+    for external in ExternalUser.objects.all():
+        entries[external.account_number] = AttendeeDirectory(
+            account_number=external.account_number,
+            kind='external',
+            external_user=external,
+            full_name=external.full_name,
+            status=external.status,
+        )
+    # Los perfiles tienen prioridad sobre los externos con el mismo número de cuenta
+    for profile in UserProfile.objects.all():
+        entries[profile.account_number] = AttendeeDirectory(
+            account_number=profile.account_number,
+            kind=profile.user_type,
+            profile=profile,
+            full_name=profile.full_name,
+            status='active',
+        )
+
+    AttendeeDirectory.objects.bulk_create(entries.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_assistantprofile_student_alter_asistente_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendeeDirectory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account_number', models.CharField(max_length=7, unique=True, verbose_name='Número de cuenta')),
+                ('kind', models.CharField(choices=[('student', 'Estudiante'), ('assistant', 'Asistente'), ('external', 'Usuario Externo')], max_length=10, verbose_name='Tipo')),
+                ('full_name', models.CharField(max_length=200, verbose_name='Nombre completo')),
+                ('status', models.CharField(help_text="'active' para perfiles; estado de aprobación para usuarios externos", max_length=10, verbose_name='Estado')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('external_user', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='directory_entry', to='authentication.externaluser', verbose_name='Usuario externo')),
+                ('profile', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='directory_entry', to='authentication.userprofile', verbose_name='Perfil')),
+            ],
+            options={
+                'verbose_name': 'Entrada del directorio',
+                'verbose_name_plural': 'Directorio de asistentes',
+            },
+        ),
+        migrations.RunPython(populate_attendee_directory, migrations.RunPython.noop),
+    ]
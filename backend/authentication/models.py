@@ -1,8 +1,11 @@
+import time
 from django.contrib.auth.models import User
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from mac_attendance.caching import local_expiry
 
 class UserProfile(models.Model):
     USER_TYPES = (
@@ -131,6 +134,145 @@ class ExternalUser(models.Model):
         return f"{icon} {self.full_name} - {self.account_number}"
 
 
+class AttendeeDirectory(models.Model):
+    """
+    Directorio desnormalizado de números de cuenta.
+
+    Reúne en una sola tabla indexada a los perfiles (estudiantes y asistentes) y a
+    los usuarios externos, para resolver cualquier número de cuenta con una consulta.
+    Se mantiene sincronizado mediante señales (ver authentication/signals.py).
+    Si un número de cuenta existe en ambas tablas, el perfil tiene prioridad (como
+    en el login); para registrar asistencia, un usuario externo aprobado gana a un
+    asistente (ver authentication/attendee_cache.py).
+    """
+    KINDS = (
+        ('student', 'Estudiante'),
+        ('assistant', 'Asistente'),
+        ('external', 'Usuario Externo'),
+    )
+
+    account_number = models.CharField(
+        max_length=7,
+        unique=True,
+        verbose_name="Número de cuenta"
+    )
+    kind = models.CharField(
+        max_length=10,
+        choices=KINDS,
+        verbose_name="Tipo"
+    )
+    profile = models.OneToOneField(
+        UserProfile,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='directory_entry',
+        verbose_name="Perfil"
+    )
+    external_user = models.OneToOneField(
+        ExternalUser,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='directory_entry',
+        verbose_name="Usuario externo"
+    )
+    full_name = models.CharField(
+        max_length=200,
+        verbose_name="Nombre completo"
+    )
+    status = models.CharField(
+        max_length=10,
+        verbose_name="Estado",
+        help_text="'active' para perfiles; estado de aprobación para usuarios externos"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Entrada del directorio"
+        verbose_name_plural = "Directorio de asistentes"
+
+    @property
+    def is_attendee(self):
+        """Puede registrar asistencia: estudiante o usuario externo aprobado"""
+        return self.kind == 'student' or (self.kind == 'external' and self.status == 'approved')
+
+    @classmethod
+    def resolve(cls, account_number):
+        """Resolver un número de cuenta con una sola consulta indexada"""
+        return cls.objects.filter(account_number=account_number).first()
+
+    @classmethod
+    def _build_entries(cls, account_numbers):
+        """Construir (sin guardar) las entradas a partir de las tablas de origen"""
+        entries = {}
+        for external in ExternalUser.objects.filter(account_number__in=account_numbers):
+            entries[external.account_number] = cls(
+                account_number=external.account_number,
+                kind='external',
+                external_user=external,
+                full_name=external.full_name,
+                status=external.status
+            )
+        # Los perfiles sobrescriben a los externos con el mismo número de cuenta
+        for profile in UserProfile.objects.filter(account_number__in=account_numbers):
+            entries[profile.account_number] = cls(
+                account_number=profile.account_number,
+                kind=profile.user_type,
+                profile=profile,
+                full_name=profile.full_name,
+                status='active'
+            )
+        return entries
+
+    @classmethod
+    def sync_accounts(cls, account_numbers):
+        """Sincronizar el directorio para un conjunto de números de cuenta; devuelve los afectados"""
+        accounts = {str(account) for account in account_numbers if account}
+        if not accounts:
+            return set()
+
+        entries = cls._build_entries(accounts)
+
+        # Entradas que apuntan a estos perfiles/externos con otro número de cuenta
+        # (cambio de número de cuenta): también hay que reconstruirlas
+        stale = set(
+            cls.objects.filter(
+                models.Q(profile_id__in=[e.profile_id for e in entries.values() if e.profile_id]) |
+                models.Q(external_user_id__in=[e.external_user_id for e in entries.values() if e.external_user_id])
+            ).exclude(account_number__in=accounts).values_list('account_number', flat=True)
+        )
+        if stale:
+            accounts |= stale
+            for account, entry in cls._build_entries(stale).items():
+                entries.setdefault(account, entry)
+
+        with transaction.atomic():
+            cls.objects.filter(account_number__in=accounts).delete()
+            cls.objects.bulk_create(entries.values())
+
+        return accounts
+
+    @classmethod
+    def rebuild(cls):
+        """Reconstruir todo el directorio desde cero (ruta de reparación)"""
+        accounts = set(UserProfile.objects.values_list('account_number', flat=True))
+        accounts |= set(ExternalUser.objects.values_list('account_number', flat=True))
+
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(cls._build_entries(accounts).values(), batch_size=1000)
+
+    def __str__(self):
+        return f"{self.account_number} - {self.full_name} ({self.get_kind_display()})"
+
+
+SYSTEM_CONFIG_VERSION_KEY = 'system_config:version'
+
+# Copia local del proceso de la configuración (ver SystemConfiguration.get_config)
+_config_cache = {'version': None, 'config': None, 'expires': 0}
+
+
 class SystemConfiguration(models.Model):
     """Configuración global del sistema"""
     minimum_attendance_percentage = models.FloatField(
@@ -157,14 +299,52 @@ class SystemConfiguration(models.Model):
         if not self.pk and SystemConfiguration.objects.exists():
             raise ValidationError("Solo puede existir una configuración del sistema.")
         super().save(*args, **kwargs)
+        self.invalidate_cache()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.invalidate_cache()
+        return result
+
+    @classmethod
+    def _cache_version(cls):
+        version = cache.get(SYSTEM_CONFIG_VERSION_KEY)
+        if version is None:
+            cache.add(SYSTEM_CONFIG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+            version = cache.get(SYSTEM_CONFIG_VERSION_KEY)
+        return version
+
+    @classmethod
+    def invalidate_cache(cls):
+        """Descartar la copia en memoria de todos los procesos (al confirmar la transacción)"""
+        def bump():
+            try:
+                cache.incr(SYSTEM_CONFIG_VERSION_KEY)
+            except ValueError:
+                cache.set(SYSTEM_CONFIG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+            _config_cache['version'] = None
+        bump()
+        transaction.on_commit(bump)
 
     @classmethod
     def get_config(cls):
-        """Obtener o crear la configuración del sistema"""
+        """
+        Obtener o crear la configuración del sistema. Se guarda una copia por proceso
+        que se reutiliza mientras no cambie la versión guardada en la caché compartida,
+        hasta LOCAL_CACHE_TTL segundos (con un backend local la versión no llega a los
+        demás workers).
+        """
+        version = cls._cache_version()
+        if _config_cache['version'] == version and time.monotonic() < _config_cache['expires']:
+            return _config_cache['config']
+
         config, created = cls.objects.get_or_create(
             pk=1,
             defaults={'minimum_attendance_percentage': 80.0}
         )
+        _config_cache['version'] = version
+        _config_cache['config'] = config
+        _config_cache['expires'] = local_expiry()
         return config
 
     def __str__(self):
@@ -0,0 +1,95 @@
+"""
+Validación por conjuntos de padrones de estudiantes y asistentes.
+
+Valida el archivo completo antes de escribir cualquier fila: el formato de los
+números de cuenta se revisa sobre toda la columna, los repetidos dentro del
+archivo con un Counter y los conflictos con cuentas existentes con una sola
+consulta __in por tabla (UserProfile y ExternalUser), en lugar de una o más
+consultas por fila. También se rechazan los números de cuenta cuyo usuario de
+Django (username) ya tiene un perfil con otro número de cuenta, porque el
+importador reutiliza ese usuario y el perfil nuevo chocaría con el existente.
+
+La usan el importador por lotes (authentication/importers.py) y los recursos
+de import-export del admin.
+"""
+import re
+from collections import Counter
+from django.db.models import F
+from .models import UserProfile, ExternalUser
+
+ACCOUNT_NUMBER_RE = re.compile(r'^\d{7}$')
+FULL_NAME_MAX_LENGTH = UserProfile._meta.get_field('full_name').max_length
+
+
+def clean_cell(value):
+    """Texto limpio de una celda; los números enteros de XLSX (1234567.0) pierden el '.0'"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value if value is not None else '').strip()
+
+
+def validate_roster(account_numbers, full_names, user_type, first_row=2):
+    """
+    Validar las columnas de un padrón de un solo tipo de usuario.
+
+    Devuelve (filas_válidas, errores): filas_válidas es una lista de
+    (número_de_fila, número_de_cuenta, nombre) y errores una lista ordenada de
+    (número_de_fila, mensaje). first_row es el número de la primera fila de datos.
+    """
+    account_numbers = [clean_cell(value) for value in account_numbers]
+    full_names = [clean_cell(value) for value in full_names]
+    rows = list(zip(range(first_row, first_row + len(account_numbers)), account_numbers, full_names))
+
+    errors = []
+    valid = []
+    for number, account_number, full_name in rows:
+        if not ACCOUNT_NUMBER_RE.match(account_number):
+            errors.append((number, f'Número de cuenta inválido: "{account_number}" (deben ser 7 dígitos)'))
+        elif not full_name:
+            errors.append((number, f'Falta el nombre completo de {account_number}'))
+        elif len(full_name) > FULL_NAME_MAX_LENGTH:
+            errors.append((number, f'Nombre demasiado largo para {account_number}'))
+        else:
+            valid.append((number, account_number, full_name))
+
+    counts = Counter(account_number for _, account_number, _ in valid)
+    accounts = list(counts)
+    profile_conflicts = dict(
+        UserProfile.objects.filter(account_number__in=accounts)
+        .exclude(user_type=user_type)
+        .values_list('account_number', 'user_type')
+    )
+    external_conflicts = set(
+        ExternalUser.objects.filter(account_number__in=accounts).values_list('account_number', flat=True)
+    )
+    # Usuarios de Django con ese username que ya tienen perfil con otro número de cuenta
+    user_conflicts = dict(
+        UserProfile.objects.filter(user__username__in=accounts)
+        .exclude(account_number=F('user__username'))
+        .values_list('user__username', 'account_number')
+    )
+    user_types = dict(UserProfile.USER_TYPES)
+
+    cleaned = []
+    for number, account_number, full_name in valid:
+        row_errors = []
+        if counts[account_number] > 1:
+            row_errors.append(f'Número de cuenta repetido en el archivo: {account_number}')
+        if account_number in profile_conflicts:
+            row_errors.append(
+                f'{account_number} ya está registrado como {user_types[profile_conflicts[account_number]].lower()}'
+            )
+        if account_number in external_conflicts:
+            row_errors.append(f'{account_number} ya está registrado como usuario externo')
+        if account_number in user_conflicts:
+            row_errors.append(
+                f'El usuario {account_number} ya tiene un perfil con el número de cuenta {user_conflicts[account_number]}'
+            )
+
+        if row_errors:
+            errors.extend((number, message) for message in row_errors)
+        else:
+            cleaned.append((number, account_number, full_name))
+
+    errors.sort()
+    return cleaned, errors
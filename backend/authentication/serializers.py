@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import UserProfile, AttendeeDirectory
 import re
 
 class UserProfileSerializer(serializers.ModelSerializer):
@@ -31,34 +31,32 @@ class LoginSerializer(serializers.Serializer):
         if not account_number:
             raise serializers.ValidationError('Debe incluir número de cuenta.')
 
-        # Primero buscar en usuarios regulares (estudiantes/asistentes)
-        try:
-            profile = UserProfile.objects.get(account_number=account_number)
-            user = profile.user
-            if not user.is_active:
-                raise serializers.ValidationError('Esta cuenta está desactivada.')
-            data['user'] = user
-            return data
-        except UserProfile.DoesNotExist:
-            pass
+        # Resolver usuarios regulares y externos con una sola consulta al directorio
+        entry = AttendeeDirectory.objects.select_related(
+            'profile__user', 'external_user'
+        ).filter(account_number=account_number).first()
 
-        # Si no es usuario regular, buscar en usuarios externos
-        from authentication.models import ExternalUser
-        try:
-            external_user = ExternalUser.objects.get(account_number=account_number)
-            if external_user.status != 'approved':
-                raise serializers.ValidationError('Usuario externo no aprobado.')
+        if entry is None:
+            raise serializers.ValidationError('Número de cuenta no encontrado.')
 
-            # Crear o buscar usuario de Django asociado
-            user, created = User.objects.get_or_create(
-                username=f'ext_{account_number}',
-                defaults={'first_name': external_user.full_name}
-            )
+        # Usuarios regulares (estudiantes/asistentes)
+        if entry.profile_id:
+            user = entry.profile.user
+            if not user.is_active:
+                raise serializers.ValidationError('Esta cuenta está desactivada.')
             data['user'] = user
-            data['external_user'] = external_user
             return data
 
-        except ExternalUser.DoesNotExist:
-            raise serializers.ValidationError('Número de cuenta no encontrado.')
-
-        return data
\ No newline at end of file
+        # Usuarios externos
+        external_user = entry.external_user
+        if external_user.status != 'approved':
+            raise serializers.ValidationError('Usuario externo no aprobado.')
+
+        # Crear o buscar usuario de Django asociado
+        user, created = User.objects.get_or_create(
+            username=f'ext_{account_number}',
+            defaults={'first_name': external_user.full_name}
+        )
+        data['user'] = user
+        data['external_user'] = external_user
+        return data
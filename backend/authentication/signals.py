@@ -0,0 +1,21 @@
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from .attendee_cache import attendee_cache
+from .models import UserProfile, Student, AssistantProfile, ExternalUser, AttendeeDirectory
+
+
+def sync_attendee_directory(sender, instance, **kwargs):
+    """Mantener el directorio de asistentes al guardar o eliminar perfiles y usuarios externos"""
+    accounts = AttendeeDirectory.sync_accounts([instance.account_number])
+
+    # Invalidar la caché en proceso ahora y otra vez al confirmar, por si otra
+    # solicitud la volvió a llenar con datos previos al commit
+    attendee_cache.invalidate(*accounts)
+    transaction.on_commit(partial(attendee_cache.invalidate, *accounts))
+
+
+# Los modelos proxy envían las señales con su propia clase como sender
+for model in (UserProfile, Student, AssistantProfile, ExternalUser):
+    post_save.connect(sync_attendee_directory, sender=model, dispatch_uid=f'directory_save_{model.__name__}')
+    post_delete.connect(sync_attendee_directory, sender=model, dispatch_uid=f'directory_delete_{model.__name__}')
@@ -8,4 +8,5 @@ urlpatterns = [
     path('check-auth/', views.check_auth_status, name='check_auth'),
     path('token/refresh/', views.refresh_token, name='token_refresh'),
     path('token/verify/', views.verify_token, name='token_verify'),
+    path('cache-stats/', views.cache_stats, name='cache_stats'),
 ]
\ No newline at end of file
@@ -1,6 +1,6 @@
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from django.contrib.auth import login, logout
 from django.contrib.auth.models import User
@@ -10,18 +10,41 @@ from django_ratelimit.exceptions import Ratelimited
 from .models import UserProfile, Asistente
 from .serializers import LoginSerializer, UserSerializer
 from .audit import AuditLog
+from .bruteforce import detector
+
+def _too_many_attempts(blocked):
+    """Respuesta 429 para un bloqueo (dimensión, clave, segundos restantes) del detector"""
+    retry_after = int(blocked[2]) + 1
+    response = Response({
+        'error': 'Demasiados intentos fallidos. Por favor, intenta más tarde.',
+        'retry_after': retry_after
+    }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(retry_after)
+    return response
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
 @ratelimit(key='ip', rate='5/m', method='POST', block=True)
 def login_view(request):
-    """Login con rate limiting: 5 intentos por minuto por IP"""
-    serializer = LoginSerializer(data=request.data)
+    """Login con rate limiting: 5 intentos por minuto por IP y bloqueo por fuerza bruta"""
     account_number = request.data.get('account_number', 'unknown')
+    # Sin número de cuenta no se usa la dimensión de cuenta del detector
+    tracked_account = request.data.get('account_number') or None
+    ip_address = AuditLog.get_client_ip(request)
+
+    # Bloqueo por fallos repetidos de la IP o la subred (sin consultar la base de datos).
+    # El de la cuenta se revisa después: una contraseña correcta siempre entra.
+    blocked = detector.check(ip_address)
+    if blocked:
+        return _too_many_attempts(blocked)
+
+    serializer = LoginSerializer(data=request.data)
 
     if serializer.is_valid():
         user = serializer.validated_data['user']
 
+        detector.record_success(tracked_account)
+
         # Generar tokens JWT
         refresh = RefreshToken.for_user(user)
 
@@ -60,6 +83,24 @@ def login_view(request):
         errors=str(serializer.errors)
     )
 
+    for dimension, key in detector.record_failure(ip_address, tracked_account):
+        AuditLog.log(
+            category='SECURITY',
+            action='BRUTE_FORCE_BLOCKED',
+            message=f'Bloqueo por fuerza bruta ({dimension}: {key})',
+            request=request,
+            severity='ERROR',
+            success=False,
+            status_code=429,
+            dimension=dimension,
+            blocked_value=key,
+            account_number=account_number
+        )
+
+    blocked = detector.check(None, tracked_account)
+    if blocked:
+        return _too_many_attempts(blocked)
+
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
@@ -119,4 +160,13 @@ def verify_token(request):
     return Response({
         'valid': True,
         'user': UserSerializer(request.user).data
-    })
\ No newline at end of file
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """Estadísticas de las cachés en proceso de este worker (solo staff)"""
+    from .attendee_cache import attendee_cache
+    return Response({
+        'attendee_cache': attendee_cache.stats()
+    })
@@ -1,11 +1,47 @@
 from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.utils.html import format_html
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
+from import_export.instance_loaders import BaseInstanceLoader
+from mac_attendance.exports import StreamingExportMixin
+from mac_attendance.imports import DryRunCacheAdminMixin, DryRunCacheResourceMixin
+from .cache import bump_catalog_version
 from .models import Event
 
 
-class EventResource(resources.ModelResource):
+class EventInstanceLoader(BaseInstanceLoader):
+    """
+    Carga con una sola consulta los eventos existentes en el rango de fechas del
+    archivo y los indexa por (título, fecha, hora de inicio), de modo que decidir
+    entre crear y actualizar no consulta la base de datos por fila.
+    """
+
+    def __init__(self, resource, dataset=None):
+        super().__init__(resource, dataset)
+        self.instances = {}
+        resource.imported_keys = set()
+
+        dates = set()
+        for row in dataset.dict if dataset else []:
+            try:
+                dates.add(resource.fields['date'].clean(row))
+            except ValueError:
+                continue
+        dates.discard(None)
+        if dates:
+            for event in Event.objects.filter(date__range=(min(dates), max(dates))):
+                self.instances[EventResource.event_key(event.title, event.date, event.start_time)] = event
+
+    def get_instance(self, row):
+        fields = self.resource.fields
+        return self.instances.get(EventResource.event_key(
+            fields['title'].clean(row), fields['date'].clean(row), fields['start_time'].clean(row)
+        ))
+
+
+class EventResource(DryRunCacheResourceMixin, resources.ModelResource):
     """Recurso para importar/exportar eventos"""
 
     class Meta:
@@ -13,26 +49,54 @@ class EventResource(resources.ModelResource):
         fields = ('title', 'speaker', 'date', 'start_time', 'end_time', 'event_type',
                   'modality', 'location', 'description', 'is_active')
         import_id_fields = ['title', 'date', 'start_time']
+        instance_loader_class = EventInstanceLoader
+        use_bulk = True
+        batch_size = 500
         skip_unchanged = True
         report_skipped = True
 
+    @staticmethod
+    def event_key(title, date, start_time):
+        return (str(title or '').strip(), date, start_time)
+
     def before_import_row(self, row, **kwargs):
         """Limpiar datos antes de importar"""
         row['title'] = str(row.get('title', '')).strip()
         row['speaker'] = str(row.get('speaker', '')).strip()
         row['location'] = str(row.get('location', '')).strip()
 
-    def before_save_instance(self, instance, using_transactions, dry_run):
-        """Asignar el usuario que está importando como creador"""
-        if not dry_run and not instance.created_by_id:
-            # Obtener el request del contexto
-            request = self.get_import_context().get('request')
-            if request and hasattr(request.user, 'profile'):
-                instance.created_by = request.user.profile
+    def before_save_instance(self, instance, row, **kwargs):
+        """
+        Asignar el creador y preparar el evento para bulk_create/bulk_update,
+        que no llaman a Event.save(): se valida y se calculan starts_at/ends_at aquí
+        """
+        if not instance.created_by_id:
+            user = kwargs.get('user')
+            if user is not None and hasattr(user, 'userprofile'):
+                instance.created_by = user.userprofile
+        key = self.event_key(instance.title, instance.date, instance.start_time)
+        if key in self.imported_keys:
+            raise ValidationError(f'Evento repetido en el archivo: {instance.title} ({instance.date} {instance.start_time})')
+        self.imported_keys.add(key)
+        instance.clean()
+        instance.update_datetimes()
+
+    def get_bulk_update_fields(self):
+        return super().get_bulk_update_fields() + ['starts_at', 'ends_at']
+
+    def after_import(self, dataset, result, **kwargs):
+        """Las escrituras en bloque no envían señales: invalidar catálogo y estadísticas una sola vez"""
+        super().after_import(dataset, result, **kwargs)
+        if kwargs.get('dry_run') or not (result.totals['new'] or result.totals['update']):
+            return
+
+        from attendance.models import AttendanceStats
+        transaction.on_commit(bump_catalog_version)
+        transaction.on_commit(AttendanceStats.refresh_denominators)
 
 
 @admin.register(Event)
-class EventAdmin(ImportExportModelAdmin):
+class EventAdmin(DryRunCacheAdminMixin, StreamingExportMixin, ImportExportModelAdmin):
     resource_class = EventResource
     list_display = ['title', 'speaker', 'date', 'start_time', 'modality', 'location', 'is_active', 'get_created_by']
     list_filter = ['event_type', 'modality', 'date', 'is_active', 'created_by']
@@ -40,7 +104,8 @@ class EventAdmin(ImportExportModelAdmin):
     date_hierarchy = 'date'
     ordering = ['date', 'start_time']
     readonly_fields = ['created_at']
-    actions = ['export_selected_events']
+    actions = ['export_selected_events', 'export_selected_csv', 'export_selected_jsonl']
+    streaming_export_filename = 'eventos'
 
     def get_created_by(self, obj):
         """Muestra quién creó el evento"""
@@ -64,21 +129,6 @@ class EventAdmin(ImportExportModelAdmin):
 
     def export_selected_events(self, request, queryset):
         """Acción para exportar eventos seleccionados"""
-        from django.http import HttpResponse
-        resource = EventResource()
-        dataset = resource.export(queryset)
-
-        from import_export.formats.base_formats import XLSX
-        xlsx_format = XLSX()
-        export_data = xlsx_format.export_data(dataset)
-
-        response = HttpResponse(
-            export_data,
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename="eventos.xlsx"'
-
-        self.message_user(request, f'Se exportaron {queryset.count()} eventos.')
-        return response
+        return self.stream_export(request, queryset, 'xlsx', 'eventos')
 
     export_selected_events.short_description = "📊 Exportar eventos seleccionados"
\ No newline at end of file
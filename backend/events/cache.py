@@ -0,0 +1,71 @@
+"""
+Caché del catálogo de eventos compartida entre procesos.
+
+El catálogo tiene un número de versión guardado en el backend de caché
+(compartido entre workers si se usa Redis/Memcached). Cada alta, baja o
+cambio de un evento incrementa la versión, lo que invalida de golpe todos
+los valores derivados del catálogo sin tener que borrarlos uno por uno.
+
+Con un backend local (LocMemCache) los demás workers no ven el incremento, así
+que las copias de cada proceso vencen a los LOCAL_CACHE_TTL segundos y se
+recalculan desde la base de datos.
+"""
+import time
+from django.core.cache import cache
+from mac_attendance.caching import is_shared_cache, local_expiry
+
+CATALOG_VERSION_KEY = 'events:catalog_version'
+ACTIVE_COUNT_KEY = 'events:active_count:{version}'
+CACHE_TIMEOUT = 60 * 60 * 24  # 1 día
+
+# Copia local del proceso para no repetir ni siquiera la lectura del conteo
+_local = {'version': None, 'active_count': None, 'expires': 0}
+
+
+def _initial_version():
+    """Versión inicial única para que una clave expulsada nunca reutilice una versión vieja"""
+    return int(time.time() * 1000)
+
+
+def get_catalog_version():
+    """Obtener la versión actual del catálogo de eventos"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidar todos los valores derivados del catálogo en todos los procesos"""
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # La clave no existía (o fue expulsada): empezar con una versión nueva
+        version = _initial_version()
+        cache.set(CATALOG_VERSION_KEY, version, timeout=None)
+        return version
+
+
+def get_active_event_count():
+    """
+    Total de eventos activos. En el caso común no ejecuta consultas:
+    se sirve de la copia local o del backend de caché para la versión vigente.
+    """
+    from .models import Event
+
+    version = get_catalog_version()
+    if _local['version'] == version and time.monotonic() < _local['expires']:
+        return _local['active_count']
+
+    key = ACTIVE_COUNT_KEY.format(version=version)
+    # Con un backend local el conteo guardado puede ser de antes de un cambio en otro worker
+    count = cache.get(key) if is_shared_cache() else None
+    if count is None:
+        count = Event.objects.filter(is_active=True).count()
+        cache.set(key, count, CACHE_TIMEOUT)
+
+    _local['version'] = version
+    _local['active_count'] = count
+    _local['expires'] = local_expiry()
+    return count
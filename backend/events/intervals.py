@@ -0,0 +1,101 @@
+"""
+Índice de intervalos de eventos activos por fecha.
+
+Para cada fecha se guardan los eventos activos ordenados por hora de inicio y
+por hora de fin. Los eventos que se traslapan con [inicio, fin) son los que
+empiezan antes del fin (prefijo del arreglo de inicios) y terminan después del
+inicio (sufijo del arreglo de fines), así que basta con dos búsquedas binarias
+en lugar de una consulta a la base de datos por cada escaneo.
+
+El índice vive en la memoria del proceso y se construye por fecha la primera vez
+que se consulta. Está ligado a la versión del catálogo de eventos: cualquier
+alta, baja o cambio de un evento lo descarta completo. Como con un backend de
+caché local la versión no se comparte entre workers, el índice también se
+descarta a los LOCAL_CACHE_TTL segundos de construido.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from mac_attendance.caching import local_expiry
+from .cache import get_catalog_version
+
+
+class DayIndex:
+    """Intervalos de los eventos activos de una fecha"""
+
+    def __init__(self, events):
+        self.events = {event['id']: event for event in events}
+        by_start = sorted(events, key=lambda e: (e['starts_at'], e['id']))
+        by_end = sorted(events, key=lambda e: (e['ends_at'], e['id']))
+        self.starts = [e['starts_at'] for e in by_start]
+        self.start_ids = [e['id'] for e in by_start]
+        self.ends = [e['ends_at'] for e in by_end]
+        self.end_ids = [e['id'] for e in by_end]
+        self._overlaps = {}
+
+    def conflicts(self, starts_at, ends_at, exclude_id=None):
+        """Ids de los eventos que se traslapan con [starts_at, ends_at)"""
+        started = self.start_ids[:bisect_left(self.starts, ends_at)]
+        if not started:
+            return []
+        not_ended = set(self.end_ids[bisect_right(self.ends, starts_at):])
+        return [event_id for event_id in started if event_id in not_ended and event_id != exclude_id]
+
+    def overlapping(self, event):
+        """Ids de los eventos que se traslapan con el evento dado (memorizado por evento)"""
+        key = (event.id, event.starts_at, event.ends_at)
+        if key not in self._overlaps:
+            self._overlaps[key] = self.conflicts(event.starts_at, event.ends_at, exclude_id=event.id)
+        return self._overlaps[key]
+
+
+class EventIntervalIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._expires = 0
+        self._days = {}
+
+    def day(self, date):
+        """Obtener (o construir) el índice de una fecha para la versión vigente del catálogo"""
+        from .models import Event
+
+        version = get_catalog_version()
+        with self._lock:
+            if self._version != version or time.monotonic() >= self._expires:
+                self._version = version
+                self._expires = local_expiry()
+                self._days = {}
+            index = self._days.get(date)
+        if index is not None:
+            return index
+
+        events = list(
+            Event.objects.filter(date=date, is_active=True)
+            .values('id', 'title', 'start_time', 'end_time', 'location', 'starts_at', 'ends_at')
+        )
+        index = DayIndex(events)
+        with self._lock:
+            if self._version == version:
+                self._days[date] = index
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+            self._expires = 0
+            self._days = {}
+
+
+event_intervals = EventIntervalIndex()
+
+
+def overlapping_event_ids(event):
+    """Ids de los eventos activos simultáneos al evento dado (sin incluirlo)"""
+    return event_intervals.day(event.date).overlapping(event)
+
+
+def schedule_conflicts(date, starts_at, ends_at, exclude_id=None):
+    """Eventos activos de la fecha que se traslapan con el horario dado"""
+    index = event_intervals.day(date)
+    return [index.events[event_id] for event_id in index.conflicts(starts_at, ends_at, exclude_id)]
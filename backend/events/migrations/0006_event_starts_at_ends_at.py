@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-17 10:30
+
+from datetime import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def combine_datetime(date, time):
+    value = datetime.combine(date, time)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def populate_event_datetimes(apps, schema_editor):
+    """Calcular starts_at/ends_at de los eventos existentes"""
+    Event = apps.get_model('events', 'Event')
+
+    events = list(Event.objects.all())
+    for event in events:
+        event.starts_at = combine_datetime(event.date, event.start_time)
+        event.ends_at = combine_datetime(event.date, event.end_time)
+    Event.objects.bulk_update(events, ['starts_at', 'ends_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_delete_externaluser'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='starts_at',
+            field=models.DateTimeField(null=True, editable=False, verbose_name='Inicio (fecha y hora)'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='ends_at',
+            field=models.DateTimeField(null=True, editable=False, verbose_name='Fin (fecha y hora)'),
+        ),
+        migrations.RunPython(populate_event_datetimes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='event',
+            name='starts_at',
+            field=models.DateTimeField(db_index=True, editable=False, verbose_name='Inicio (fecha y hora)'),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='ends_at',
+            field=models.DateTimeField(db_index=True, editable=False, verbose_name='Fin (fecha y hora)'),
+        ),
+    ]
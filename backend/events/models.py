@@ -2,6 +2,30 @@ from django.db import models
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from authentication.models import UserProfile
+from datetime import datetime, timedelta
+
+# Se permite registrar asistencia desde 10 minutos antes del inicio
+REGISTRATION_LEAD = timedelta(minutes=10)
+
+
+class EventQuerySet(models.QuerySet):
+    def open_for_registration(self, now=None):
+        """Eventos activos que aceptan registros en este momento (consulta por rango indexada)"""
+        now = now or timezone.now()
+        return self.filter(
+            is_active=True,
+            starts_at__lte=now + REGISTRATION_LEAD,
+            ends_at__gte=now
+        )
+
+    def overlapping(self, event):
+        """Eventos activos que se traslapan con el evento dado (excluyéndolo)"""
+        return self.filter(
+            is_active=True,
+            starts_at__lt=event.ends_at,
+            ends_at__gt=event.starts_at
+        ).exclude(id=event.id)
+
 
 class Event(models.Model):
     EVENT_TYPES = (
@@ -73,6 +97,16 @@ class Event(models.Model):
         verbose_name="ID de reunión",
         help_text="Código de sala/reunión"
     )
+    starts_at = models.DateTimeField(
+        editable=False,
+        db_index=True,
+        verbose_name="Inicio (fecha y hora)"
+    )
+    ends_at = models.DateTimeField(
+        editable=False,
+        db_index=True,
+        verbose_name="Fin (fecha y hora)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(
         'authentication.UserProfile',
@@ -81,6 +115,8 @@ class Event(models.Model):
         verbose_name="Creado por"
     )
     
+    objects = EventQuerySet.as_manager()
+
     class Meta:
         ordering = ['date', 'start_time']
         verbose_name = "Evento/Ponencia"
@@ -94,12 +130,7 @@ class Event(models.Model):
         
         # Validar que la fecha/hora del evento no haya terminado
         if self.date and self.end_time:
-            from datetime import datetime
-            event_end = datetime.combine(self.date, self.end_time)
-
-            # Hacer timezone-aware si es necesario
-            if timezone.is_naive(event_end):
-                event_end = timezone.make_aware(event_end)
+            event_end = self.combine_datetime(self.date, self.end_time)
 
             # Solo validar si el evento ya terminó completamente
             if event_end < timezone.now():
@@ -109,10 +140,38 @@ class Event(models.Model):
         if self.modality in ['online', 'hybrid'] and not self.meeting_link:
             raise ValidationError("Los eventos en línea o híbridos requieren un enlace de reunión.")
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Recordar si estaba activo para detectar cambios en el catálogo
+        instance._loaded_is_active = dict(zip(field_names, values)).get('is_active')
+        return instance
+
     def save(self, *args, **kwargs):
         self.clean()
+        self.update_datetimes()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'starts_at', 'ends_at'}
         super().save(*args, **kwargs)
-    
+
+    @staticmethod
+    def combine_datetime(date, time):
+        """Combinar fecha y hora en un datetime timezone-aware"""
+        value = datetime.combine(date, time)
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def update_datetimes(self):
+        """Mantener starts_at/ends_at a partir de date, start_time y end_time"""
+        self.starts_at = self.combine_datetime(self.date, self.start_time)
+        self.ends_at = self.combine_datetime(self.date, self.end_time)
+
+    def get_registration_window(self):
+        """Ventana de registro de asistencia: desde 10 minutos antes del inicio hasta el final"""
+        return self.starts_at - REGISTRATION_LEAD, self.ends_at
+
     @property
     def duration_minutes(self):
         """Duración del evento en minutos"""
@@ -126,11 +185,7 @@ class Event(models.Model):
     @property
     def is_happening_now(self):
         """Verifica si el evento está ocurriendo ahora"""
-        now = timezone.now()
-        if self.date == now.date():
-            current_time = now.time()
-            return self.start_time <= current_time <= self.end_time
-        return False
+        return self.starts_at <= timezone.now() <= self.ends_at
     
     @property
     def is_online(self):
@@ -8,8 +8,10 @@ class EventSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'description', 'event_type', 'modality',
             'speaker', 'date', 'start_time', 'end_time', 'location',
-            'max_capacity', 'is_active', 'meeting_link'
+            'max_capacity', 'is_active', 'meeting_link',
+            'starts_at', 'ends_at'
         ]
+        read_only_fields = ['starts_at', 'ends_at']
 
 class ExternalUserSerializer(serializers.ModelSerializer):
     class Meta:
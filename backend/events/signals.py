@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .cache import bump_catalog_version
+from .models import Event
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_event_catalog(sender, instance, **kwargs):
+    """Invalidar la caché del catálogo cuando se confirma el cambio de un evento"""
+    transaction.on_commit(bump_catalog_version)
@@ -6,7 +6,8 @@ from django_ratelimit.decorators import ratelimit
 from django.utils import timezone
 from django.db import models
 from .models import Event
-from authentication.models import ExternalUser
+from .intervals import schedule_conflicts
+from authentication.models import ExternalUser, AttendeeDirectory
 from .serializers import EventSerializer, ExternalUserSerializer
 import re
 
@@ -34,7 +35,31 @@ class EventListView(generics.ListCreateAPIView):
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied('Usuario sin perfil válido')
 
-        serializer.save()
+        self.created_event = serializer.save(created_by=user_profile)
+
+    def create(self, request, *args, **kwargs):
+        """Crear el evento e informar los eventos activos con horario traslapado"""
+        response = super().create(request, *args, **kwargs)
+        event = self.created_event
+        response.data['schedule_conflicts'] = [
+            {
+                'id': conflict['id'],
+                'title': conflict['title'],
+                'start_time': conflict['start_time'],
+                'end_time': conflict['end_time'],
+                'location': conflict['location'],
+            }
+            for conflict in schedule_conflicts(event.date, event.starts_at, event.ends_at, exclude_id=event.id)
+        ]
+        return response
+
+class OpenEventListView(generics.ListAPIView):
+    """Eventos que aceptan registro de asistencia en este momento"""
+    serializer_class = EventSerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        return Event.objects.open_for_registration().order_by('starts_at')
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -60,15 +85,13 @@ def register_external_user(request):
     if not re.match(r'^\d{7}$', account_number):
         return Response({'error': 'El número de cuenta debe tener exactamente 7 dígitos'}, status=400)
 
-    # Verificar que no exista en usuarios regulares
-    from authentication.models import UserProfile
-    if UserProfile.objects.filter(account_number=account_number).exists():
+    # Verificar que no exista en usuarios regulares ni externos (una sola consulta al directorio)
+    existing = AttendeeDirectory.resolve(account_number)
+    if existing is not None:
+        if existing.kind == 'external':
+            return Response({'error': 'Este número de cuenta ya está registrado como usuario externo'}, status=400)
         return Response({'error': 'Este número de cuenta ya está registrado como usuario regular'}, status=400)
 
-    # Verificar que no exista en usuarios externos
-    if ExternalUser.objects.filter(account_number=account_number).exists():
-        return Response({'error': 'Este número de cuenta ya está registrado como usuario externo'}, status=400)
-
     try:
         external_user = ExternalUser.objects.create(
             full_name=full_name,
@@ -0,0 +1,44 @@
+"""
+Utilidades para las cachés que dependen de un número de versión compartido.
+
+Las versiones (catálogo de eventos, configuración del sistema) se guardan en el
+backend de caché por defecto. Con LocMemCache cada worker tiene su propio
+backend, así que una invalidación solo llega al proceso que la hizo: por eso
+las copias locales de los procesos expiran cada LOCAL_CACHE_TTL segundos y, si
+el backend no se comparte, se vuelven a leer de la base de datos.
+"""
+import time
+from django.conf import settings
+from django.core import checks
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache():
+    """True si el backend de caché por defecto se comparte entre procesos (Redis, Memcached, BD)"""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def local_expiry():
+    """Momento (time.monotonic) en que vence una copia local creada ahora"""
+    return time.monotonic() + settings.LOCAL_CACHE_TTL
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.DEBUG or is_shared_cache():
+        return []
+    return [
+        checks.Warning(
+            'El backend de caché por defecto es local de cada proceso.',
+            hint=(
+                'Con varios workers las invalidaciones no llegan a los demás procesos: '
+                'sus copias tardan hasta LOCAL_CACHE_TTL segundos en actualizarse. '
+                'Configure Redis o Memcached en CACHES.'
+            ),
+            id='mac_attendance.W001',
+        )
+    ]
@@ -0,0 +1,99 @@
+"""
+Reutilización del dry-run de django-import-export al confirmar una importación.
+
+El flujo del admin lee y valida el archivo dos veces: en la vista previa
+(dry-run) y otra vez al confirmar. Con estos mixins, el dry-run guarda en la
+caché del servidor el dataset ya leído, sin las filas que resultaron sin
+cambios, con la clave del archivo temporal de la importación (el token que
+viaja en el formulario de confirmación) y el usuario que la hizo. Al confirmar
+se aplica ese dataset directamente: no se vuelve a leer el archivo y las filas
+sin cambios no se vuelven a validar.
+
+Si la entrada no está en la caché (expiró, otro worker con caché local, etc.)
+se usa el flujo normal de django-import-export.
+"""
+import os
+import tablib
+from django.core.cache import cache
+from import_export.results import RowResult
+
+DRY_RUN_CACHE_TIMEOUT = 60 * 60  # 1 hora para confirmar la importación
+
+
+def dry_run_cache_key(user_id, import_token):
+    # El formulario de confirmación conserva solo el nombre del archivo temporal, sin la ruta
+    return f'import:dry_run:{user_id}:{os.path.basename(import_token)}'
+
+
+class DryRunCacheResourceMixin:
+    """Recurso que guarda su dataset validado al terminar un dry-run sin errores"""
+
+    def before_import(self, dataset, **kwargs):
+        super().before_import(dataset, **kwargs)
+        self._dry_run_skipped_rows = set()
+
+    def import_row(self, row, instance_loader, **kwargs):
+        row_result = super().import_row(row, instance_loader, **kwargs)
+        if kwargs.get('dry_run_cache_key') and row_result.import_type == RowResult.IMPORT_TYPE_SKIP:
+            self._dry_run_skipped_rows.add(kwargs.get('row_number'))
+        return row_result
+
+    def after_import(self, dataset, result, **kwargs):
+        super().after_import(dataset, result, **kwargs)
+        key = kwargs.get('dry_run_cache_key')
+        if not key or not kwargs.get('dry_run') or result.has_errors() or result.has_validation_errors():
+            return
+
+        skipped = getattr(self, '_dry_run_skipped_rows', set())
+        pending = tablib.Dataset(headers=dataset.headers)
+        for number, row in enumerate(dataset, 1):
+            if number not in skipped:
+                pending.append(row)
+        cache.set(key, pending, DRY_RUN_CACHE_TIMEOUT)
+
+
+class DryRunCacheAdminMixin:
+    """ImportMixin que confirma con el dataset guardado por el dry-run"""
+
+    def get_import_data_kwargs(self, **kwargs):
+        form = kwargs.get('form')
+        request = kwargs.get('request')
+        import_file = getattr(form, 'cleaned_data', {}).get('import_file')
+        import_kwargs = super().get_import_data_kwargs(**kwargs)
+        # Solo el formulario del dry-run trae el archivo subido (con su nombre temporal)
+        token = getattr(import_file, 'tmp_storage_name', None)
+        if token and request is not None:
+            import_kwargs['dry_run_cache_key'] = dry_run_cache_key(request.user.pk, token)
+        return import_kwargs
+
+    def process_import(self, request, **kwargs):
+        if not self.has_import_permission(request):
+            return super().process_import(request, **kwargs)
+
+        confirm_form = self.create_confirm_form(request)
+        if not confirm_form.is_valid():
+            return super().process_import(request, **kwargs)
+
+        token = confirm_form.cleaned_data['import_file_name']
+        key = dry_run_cache_key(request.user.pk, token)
+        dataset = cache.get(key)
+        if dataset is None:
+            return super().process_import(request, **kwargs)
+        cache.delete(key)
+
+        result = self.process_dataset(dataset, confirm_form, request, **kwargs)
+        self._remove_import_file(confirm_form)
+        return self.process_result(result, request)
+
+    def _remove_import_file(self, confirm_form):
+        """Eliminar el archivo temporal que el flujo normal habría leído"""
+        input_format = self.get_import_formats()[int(confirm_form.cleaned_data['format'])](
+            encoding=self.from_encoding
+        )
+        tmp_storage = self.get_tmp_storage_class()(
+            name=confirm_form.cleaned_data['import_file_name'],
+            encoding=None if input_format.is_binary() else self.from_encoding,
+            read_mode=input_format.get_read_mode(),
+            **self.get_tmp_storage_class_kwargs(),
+        )
+        tmp_storage.remove()
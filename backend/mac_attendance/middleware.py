@@ -1,7 +1,7 @@
 """
 Middleware de auditoría para capturar eventos de seguridad
 """
-from authentication.audit import AuditLog
+from authentication.audit_coalescer import security_events
 from django_ratelimit.exceptions import Ratelimited
 
 
@@ -14,6 +14,9 @@ class AuditMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
+        # Escribir los eventos agrupados cuya ventana ya cerró
+        security_events.sweep()
+
         # Procesar la solicitud
         response = self.get_response(request)
 
@@ -26,12 +29,16 @@ class AuditMiddleware:
         """
         Registrar eventos de seguridad basados en códigos de respuesta HTTP
         """
+        # La excepción de rate limit ya quedó registrada en process_exception
+        if getattr(request, '_audit_logged', False):
+            return
+
         status_code = response.status_code
         user = request.user if hasattr(request, 'user') and request.user.is_authenticated else None
 
         # 401 Unauthorized - Acceso no autorizado
         if status_code == 401:
-            AuditLog.log(
+            security_events.add(
                 category='SECURITY',
                 action='ACCESS_DENIED',
                 message=f'Intento de acceso no autorizado a {request.path}',
@@ -46,7 +53,7 @@ class AuditMiddleware:
 
         # 403 Forbidden - Permisos insuficientes
         elif status_code == 403:
-            AuditLog.log(
+            security_events.add(
                 category='SECURITY',
                 action='ACCESS_DENIED',
                 message=f'Acceso denegado (permisos insuficientes) a {request.path}',
@@ -61,7 +68,7 @@ class AuditMiddleware:
 
         # 429 Too Many Requests - Rate limit exceeded
         elif status_code == 429:
-            AuditLog.log(
+            security_events.add(
                 category='SECURITY',
                 action='RATE_LIMITED',
                 message=f'Rate limit excedido para {request.path}',
@@ -81,7 +88,7 @@ class AuditMiddleware:
         if isinstance(exception, Ratelimited):
             user = request.user if hasattr(request, 'user') and request.user.is_authenticated else None
 
-            AuditLog.log(
+            security_events.add(
                 category='SECURITY',
                 action='RATE_LIMITED',
                 message=f'Rate limit exception en {request.path}',
@@ -94,5 +101,6 @@ class AuditMiddleware:
                 method=request.method,
                 exception=str(exception)
             )
+            request._audit_logged = True
 
         return None  # Permitir que Django maneje la excepción normalmente
\ No newline at end of file
@@ -52,6 +52,11 @@ MIDDLEWARE = [
 # Rate Limiting Configuration
 RATELIMIT_ENABLE = config('RATELIMIT_ENABLE', default=True, cast=bool)
 RATELIMIT_USE_CACHE = 'default'  # Usar cache por defecto (memory en dev)
+RATELIMIT_IP_META_KEY = 'authentication.audit.get_client_ip'
+
+# Proxies inversos propios delante de Django (nginx, balanceador): cuántas entradas
+# finales de X-Forwarded-For son de confianza. Con 0 se usa REMOTE_ADDR.
+TRUSTED_PROXY_HOPS = config('TRUSTED_PROXY_HOPS', default=0, cast=int)
 
 ROOT_URLCONF = 'mac_attendance.urls'
 
@@ -80,7 +85,9 @@ DATABASES = {
     }
 }
 
-# Cache Configuration (para rate limiting)
+# Cache Configuration (rate limiting y cachés del catálogo de eventos)
+# En producción con varios workers usar un backend compartido (Redis/Memcached)
+# para que las invalidaciones lleguen a todos los procesos.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
@@ -88,6 +95,61 @@ CACHES = {
     }
 }
 
+# Vigencia de las copias en memoria de cada proceso (catálogo de eventos, configuración,
+# índice de horarios); con un backend local se vuelven a leer de la base de datos al vencer
+LOCAL_CACHE_TTL = config('LOCAL_CACHE_TTL', default=30, cast=int)  # segundos
+
+# Caché en proceso de números de cuenta resueltos (ver authentication/attendee_cache.py)
+ATTENDEE_CACHE_SIZE = config('ATTENDEE_CACHE_SIZE', default=5000, cast=int)
+ATTENDEE_CACHE_TTL = config('ATTENDEE_CACHE_TTL', default=300, cast=int)  # segundos
+
+# Instantáneas de estadísticas de asistencia (ver attendance/stats_cache.py)
+STATS_CACHE_TTL = config('STATS_CACHE_TTL', default=300, cast=int)  # segundos
+STATS_MAX_STALENESS = config('STATS_MAX_STALENESS', default=60 * 60 * 24, cast=int)  # segundos
+
+# Flujo en vivo de asistencias (ver attendance/live.py)
+ATTENDANCE_STREAM_HEARTBEAT = config('ATTENDANCE_STREAM_HEARTBEAT', default=15, cast=int)  # segundos
+ATTENDANCE_STREAM_MAX_DURATION = config('ATTENDANCE_STREAM_MAX_DURATION', default=120, cast=int)  # segundos por conexión
+ATTENDANCE_STREAM_QUEUE_SIZE = config('ATTENDANCE_STREAM_QUEUE_SIZE', default=100, cast=int)
+# Cada conexión ocupa un hilo del worker: debe ser menor que los hilos de cada proceso
+ATTENDANCE_STREAM_MAX_CONNECTIONS = config('ATTENDANCE_STREAM_MAX_CONNECTIONS', default=4, cast=int)
+ATTENDANCE_STREAM_RETRY_MS = 3000  # Espera sugerida a EventSource antes de reconectarse
+ATTENDANCE_STREAM_TOKEN_TTL = config('ATTENDANCE_STREAM_TOKEN_TTL', default=60, cast=int)  # segundos para abrir el flujo
+
+# Escritura diferida de auditoría (ver authentication/audit_writer.py)
+AUDIT_WRITE_BEHIND = config('AUDIT_WRITE_BEHIND', default=False, cast=bool)
+AUDIT_BATCH_SIZE = config('AUDIT_BATCH_SIZE', default=200, cast=int)
+AUDIT_FLUSH_INTERVAL_MS = config('AUDIT_FLUSH_INTERVAL_MS', default=500, cast=int)
+AUDIT_QUEUE_SIZE = config('AUDIT_QUEUE_SIZE', default=10000, cast=int)
+
+# Agrupación de eventos de seguridad repetidos (ver authentication/audit_coalescer.py)
+AUDIT_COALESCE_WINDOW = config('AUDIT_COALESCE_WINDOW', default=10, cast=int)  # segundos; 0 desactiva
+AUDIT_COALESCE_MAX_KEYS = config('AUDIT_COALESCE_MAX_KEYS', default=10000, cast=int)
+
+# Retención y archivo de auditoría (ver authentication/audit_archive.py y archive_audit_logs)
+# Claves (categoría, severidad); None es comodín y gana la regla más específica
+AUDIT_RETENTION_DAYS = {
+    (None, None): config('AUDIT_RETENTION_DAYS', default=365, cast=int),
+    ('AUTH', 'INFO'): 90,        # Logins y logouts exitosos
+    ('SECURITY', None): 730,
+    (None, 'CRITICAL'): 1825,
+}
+AUDIT_ARCHIVE_DIR = config('AUDIT_ARCHIVE_DIR', default=str(BASE_DIR / 'logs' / 'audit_archive'))
+
+# Agregados por hora de auditoría (ver authentication/audit_rollups.py)
+AUDIT_ROLLUP_INTERVAL = config('AUDIT_ROLLUP_INTERVAL', default=60, cast=int)  # segundos entre actualizaciones
+AUDIT_ROLLUP_LAG = 60  # segundos de margen antes de sumar un registro
+
+# Detector de fuerza bruta en el login (ver authentication/bruteforce.py)
+BRUTEFORCE_ENABLED = config('BRUTEFORCE_ENABLED', default=True, cast=bool)
+BRUTEFORCE_MAX_KEYS = config('BRUTEFORCE_MAX_KEYS', default=10000, cast=int)  # claves por dimensión
+# threshold fallos dentro de window segundos bloquean la clave durante block segundos
+BRUTEFORCE_RULES = {
+    'ip': {'threshold': 20, 'window': 600, 'block': 900},
+    'account': {'threshold': 5, 'window': 900, 'block': 900},
+    'subnet': {'threshold': 100, 'window': 900, 'block': 900},
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
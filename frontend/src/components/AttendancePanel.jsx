@@ -1,5 +1,18 @@
 import { useState, useEffect } from 'react'
-import { apiRequest } from '../services/api'
+import { apiRequest, openEventStream } from '../services/api'
+
+const RECENT_LIMIT = 5
+
+// Unir asistencias del flujo y de /recent/ sin repetir, de la más reciente a la más antigua
+const mergeRecent = (current, incoming) => {
+    const byId = new Map()
+    for (const attendance of [...incoming, ...current]) {
+        byId.set(attendance.attendance_id, attendance)
+    }
+    return [...byId.values()]
+        .sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp) || b.attendance_id - a.attendance_id)
+        .slice(0, RECENT_LIMIT)
+}
 
 const AttendancePanel = () => {
     const [selectedEvent, setSelectedEvent] = useState('')
@@ -19,9 +32,71 @@ const AttendancePanel = () => {
 
     useEffect(() => {
         fetchEvents()
-        fetchRecentAttendances()
     }, [])
 
+    // Asistencias del evento seleccionado (o de todos): las recientes y, en vivo,
+    // las nuevas de esta y otras estaciones sin volver a consultar
+    useEffect(() => {
+        let source = null
+        let retryTimer = null
+        let closed = false
+        let lastEventId = null
+
+        setRecentAttendances([])
+
+        // Se carga después de abrir el flujo: lo publicado mientras tanto llega por el
+        // flujo y ambas fuentes se unen por attendance_id
+        const fetchRecentAttendances = async () => {
+            try {
+                const query = new URLSearchParams({ limit: RECENT_LIMIT })
+                if (selectedEvent) query.set('event', selectedEvent)
+                const response = await apiRequest(`/attendance/recent/?${query}`)
+                if (!closed) setRecentAttendances(prev => mergeRecent(prev, response.results))
+            } catch (error) {
+                console.error('Error fetching recent attendances:', error)
+            }
+        }
+
+        const connect = async () => {
+            try {
+                const params = {}
+                if (selectedEvent) params.event = selectedEvent
+                if (lastEventId) params.last_event_id = lastEventId
+                source = await openEventStream('/attendance/stream/', params)
+            } catch (error) {
+                if (!closed) retryTimer = setTimeout(connect, 5000)
+                return
+            }
+            if (closed) {
+                source.close()
+                return
+            }
+            source.addEventListener('attendance', (e) => {
+                lastEventId = e.lastEventId
+                const attendance = JSON.parse(e.data)
+                setRecentAttendances(prev => mergeRecent(prev, [attendance]))
+            })
+            if (lastEventId === null) {
+                // Primera conexión: el servidor ya registró la suscripción al responder
+                source.addEventListener('open', fetchRecentAttendances, { once: true })
+            }
+            source.onerror = () => {
+                // El token del flujo vence en segundos: en lugar de la reconexión
+                // automática se abre una conexión nueva con otro token, pidiendo
+                // lo publicado desde el último id recibido
+                source.close()
+                if (!closed) retryTimer = setTimeout(connect, 5000)
+            }
+        }
+
+        connect()
+        return () => {
+            closed = true
+            clearTimeout(retryTimer)
+            if (source) source.close()
+        }
+    }, [selectedEvent])
+
     const fetchEvents = async () => {
         try {
             const response = await apiRequest('/events/')
@@ -31,15 +106,6 @@ const AttendancePanel = () => {
         }
     }
 
-    const fetchRecentAttendances = async () => {
-        try {
-            const response = await apiRequest('/attendance/recent/')
-            setRecentAttendances(response)
-        } catch (error) {
-            console.error('Error fetching recent attendances:', error)
-        }
-    }
-
     const registerAttendance = async () => {
         if (!selectedEvent || !studentAccount) {
             setMessage('Selecciona un evento e ingresa el número de cuenta')
@@ -61,8 +127,6 @@ const AttendancePanel = () => {
             setMessageType('success')
             setStudentAccount('')
 
-            fetchRecentAttendances()
-
         } catch (error) {
             const errorMessage = error.response?.data?.error || 'Error de conexión'
             setMessage(`Error: ${errorMessage}`)
@@ -85,4 +85,12 @@ export const apiRequest = async (endpoint, options = {}) => {
     }
 
     return response.json()
-}
\ No newline at end of file
+}
+// Conexión Server-Sent Events: EventSource no permite encabezados, así que se pide
+// a `${endpoint}token/` un token de corta duración que solo abre el flujo (el JWT
+// de acceso nunca va en la URL)
+export const openEventStream = async (endpoint, params = {}) => {
+    const { token } = await apiRequest(`${endpoint}token/`, { method: 'POST' })
+    const query = new URLSearchParams({ ...params, token })
+    return new EventSource(`${API_BASE_URL}/api${endpoint}?${query}`)
+}